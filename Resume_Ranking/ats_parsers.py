@@ -1,11 +1,16 @@
+import asyncio
+import copy
 import json
 import os
+import re
 import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+import httpx
 from jsonschema import validate
-from openai import OpenAI, RateLimitError
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
 from dotenv import load_dotenv
+from storage import text_hash
 
 load_dotenv(Path(__file__).resolve().parent.parent / ".env")
 
@@ -14,6 +19,17 @@ client = OpenAI(
     api_key=os.getenv("OPENROUTER_API_KEY")
 )
 
+# Shared async client for the API server: one pooled connection set for every
+# parse / compare / explain call, so awaiting the LLM never blocks the event loop.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+async_client = AsyncOpenAI(
+    base_url=os.getenv("OPENAI_BASE_URL", "https://openrouter.ai/api/v1"),
+    api_key=os.getenv("OPENROUTER_API_KEY"),
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+    )
+)
+
 MODEL = os.getenv("MODEL_NAME", "google/gemini-2.0-flash-001")
 
 # Detailed Schemas for deep structural analysis
@@ -85,30 +101,41 @@ def enforce_defaults(obj):
             enforce_defaults(item)
     return obj
 
+def decode_llm_json(content: str, schema: Dict) -> Dict:
+    """Parses and validates an LLM JSON reply, repairing common escaping errors."""
+    # Cleaning Logic for common LLM JSON errors
+    content = content.replace("\\", "\\\\").replace("\\\\\"", "\\\"") # Escape backslashes but keep escaped quotes
+    
+    try:
+        data = json.loads(content, strict=False)
+    except json.JSONDecodeError:
+        # Fallback: aggressive cleaning
+        content = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', content)
+        data = json.loads(content, strict=False)
+
+    validate(instance=data, schema=schema)
+    return enforce_defaults(data)
+
 def call_llm_with_retry(messages, schema):
     """Reliable LLM caller with JSON schema validation."""
     for _ in range(3):
         try:
             res = client.chat.completions.create(model=MODEL, messages=messages, response_format={"type": "json_object"}, temperature=0)
-            content = res.choices[0].message.content
-            
-            # Cleaning Logic for common LLM JSON errors
-            content = content.replace("\\", "\\\\").replace("\\\\\"", "\\\"") # Escape backslashes but keep escaped quotes
-            
-            try:
-                data = json.loads(content, strict=False)
-            except json.JSONDecodeError:
-                # Fallback: aggressive cleaning
-                import re
-                content = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', content)
-                data = json.loads(content, strict=False)
-
-            validate(instance=data, schema=schema)
-            return enforce_defaults(data)
+            return decode_llm_json(res.choices[0].message.content, schema)
         except RateLimitError: time.sleep(2)
         except Exception as e: print(f"Parser Error: {e}")
     return None
 
+async def acall_llm_with_retry(messages, schema):
+    """Async twin of call_llm_with_retry on the shared pooled client."""
+    for _ in range(3):
+        try:
+            res = await async_client.chat.completions.create(model=MODEL, messages=messages, response_format={"type": "json_object"}, temperature=0)
+            return decode_llm_json(res.choices[0].message.content, schema)
+        except RateLimitError: await asyncio.sleep(2)
+        except Exception as e: print(f"Parser Error: {e}")
+    return None
+
 JD_SCHEMA = {
     "type": "object",
     "properties": {
@@ -128,16 +155,28 @@ JD_SCHEMA = {
     "required": ["title", "skills", "description"]
 }
 
-def parse_jd(text: str) -> Dict:
-    """Extracts job requirements into structured JSON matching the defined schema."""
-    msg = [
+def jd_messages(text: str) -> List[Dict]:
+    return [
         {"role": "system", "content": f"You are a Job Description Parser. Extract details from the text into this JSON schema: {json.dumps(JD_SCHEMA)}.  IMPORTANT: Return ONLY instances of the data, do not return the schema definition itself. For missing numerical values (e.g. min_experience_years), default to 0. For missing string values, default to empty string \"\"."},
         {"role": "user", "content": text}
     ]
-    return call_llm_with_retry(msg, JD_SCHEMA)
 
-def parse_resume(text: str, jd_context: str, links: List[str]) -> Dict:
-    """Parses resume with Skill Inference logic to auto-populate missing technical keywords."""
+# Bump when JD parsing changes in ways the prompt does not show
+JD_PARSE_VERSION = 1
+
+def jd_parse_version() -> str:
+    """Fingerprint of what shapes a parsed JD: model, prompt template, schema and JD_PARSE_VERSION."""
+    return text_hash(json.dumps(jd_messages("")), namespace=f"{MODEL}:{JD_PARSE_VERSION}")
+
+def parse_jd(text: str) -> Dict:
+    """Extracts job requirements into structured JSON matching the defined schema."""
+    return call_llm_with_retry(jd_messages(text), JD_SCHEMA)
+
+async def aparse_jd(text: str) -> Dict:
+    """Async parse_jd for the API server."""
+    return await acall_llm_with_retry(jd_messages(text), JD_SCHEMA)
+
+def resume_messages(text: str, jd_context: Optional[str] = None, links: Optional[List[str]] = None) -> List[Dict]:
     system_instr = (
         "You are a Technical Talent Auditor. Extract resume details into JSON. "
         "SKILL INFERENCE: If a technology (e.g. FastAPI) is in projects/experience but missing from skills array, you MUST add it to 'skills'. "
@@ -145,20 +184,65 @@ def parse_resume(text: str, jd_context: str, links: List[str]) -> Dict:
         "If currently working, use 'Present'. "
         "RULES FOR EDUCATION: Split 'degree' (e.g. Bachelor's) and 'course' (e.g. Computer Science). "
         "If the resume mentions MSc that is Masters and if it mentions BSc, that is Bachelor's. "
-        "Use detected links to enrich 'repo_link', 'live_link', or 'portfolio_url' if applicable. Detected links: " + str(links) + ". "
+        "Use detected links to enrich 'repo_link', 'live_link', or 'portfolio_url' if applicable. Detected links: " + str(links or []) + ". "
         "CALCULATE DURATION: For each experience entry, calculate the duration in years (float) locally and populate the 'duration' field. "
         "If portfolio URL is not found, return \"\". "
     )
-    msg = [{"role": "system", "content": system_instr},
-           {"role": "user", "content": f"JD Context: {jd_context}\n\nResume: {text}\n\nSchema: {json.dumps(RESUME_SCHEMA)}"}]
-    
-    data = call_llm_with_retry(msg, RESUME_SCHEMA)
-    
+    context = f"JD Context: {jd_context}\n\n" if jd_context else ""
+    return [{"role": "system", "content": system_instr},
+            {"role": "user", "content": f"{context}Resume: {text}\n\nSchema: {json.dumps(RESUME_SCHEMA)}"}]
+
+# Bump when parsing changes in ways the prompt does not show (e.g. postprocess_resume)
+RESUME_PARSE_VERSION = 1
+
+def resume_parse_version() -> str:
+    """Fingerprint of what shapes a parsed resume: model, prompt template, schema and RESUME_PARSE_VERSION."""
+    return text_hash(json.dumps(resume_messages("")), namespace=f"{MODEL}:{RESUME_PARSE_VERSION}")
+
+def postprocess_resume(data: Optional[Dict]) -> Optional[Dict]:
     # Post-process: Calculate durations
     if data and "experience" in data:
         from utils import calculate_years_from_ranges
         for exp in data["experience"]:
             # calculate_years_from_ranges expects a list, so we wrap the single item
             exp["duration"] = calculate_years_from_ranges([exp])
-            
     return data
+
+def parse_resume(text: str, jd_context: Optional[str] = None, links: Optional[List[str]] = None) -> Dict:
+    """
+    Parses resume with Skill Inference logic to auto-populate missing technical keywords.
+    Without jd_context the extraction is canonical (JD-agnostic), so one parse can be
+    cached and reused for every requisition; use enrich_skills for JD-specific inference.
+    """
+    return postprocess_resume(call_llm_with_retry(resume_messages(text, jd_context, links), RESUME_SCHEMA))
+
+async def aparse_resume(text: str, jd_context: Optional[str] = None, links: Optional[List[str]] = None) -> Dict:
+    """Async parse_resume for the API server (runs concurrently under the request semaphore)."""
+    return postprocess_resume(await acall_llm_with_retry(resume_messages(text, jd_context, links), RESUME_SCHEMA))
+
+def enrich_skills(resume_data: Dict, jd_data: Dict) -> Dict:
+    """
+    Cheap, optional JD-specific skill inference on top of a canonical parse (no LLM call).
+    A JD skill missing from 'skills' is added when the resume mentions it in a project
+    tech stack, a project/experience description or the summary.
+    Returns a copy; the cached canonical parse is left untouched.
+    """
+    enriched = copy.deepcopy(resume_data)
+    skills = enriched.setdefault("skills", [])
+    known = {s.lower() for s in skills if isinstance(s, str)}
+
+    evidence = [enriched.get("summary") or ""]
+    for proj in enriched.get("projects", []):
+        evidence.extend(proj.get("tech_stack") or [])
+        evidence.append(proj.get("description") or "")
+    for exp in enriched.get("experience", []):
+        evidence.append(exp.get("description") or "")
+    haystack = "\n".join(e for e in evidence if isinstance(e, str))
+
+    for skill in jd_data.get("skills", []) if isinstance(jd_data.get("skills"), list) else []:
+        if not isinstance(skill, str) or not skill.strip() or skill.lower() in known:
+            continue
+        if re.search(r"(?<![\w])" + re.escape(skill.strip()) + r"(?![\w])", haystack, re.IGNORECASE):
+            skills.append(skill)
+            known.add(skill.lower())
+    return enriched
@@ -0,0 +1,44 @@
+import sys
+import time
+
+import numpy as np
+
+from model_registry import EMBEDDING_BACKENDS, get_model
+from scoring import EMBED_BATCH_SIZE, MODEL_NAME
+# Resume-like phrases (skills, titles, project lines) the corpus is built from
+PHRASES = [
+    "Python", "PyTorch", "TensorFlow", "Scikit-learn", "FastAPI", "Docker", "AWS", "SQL",
+    "Machine Learning Engineer Intern", "Backend Developer", "Data Analyst",
+    "Built a RAG pipeline over internal documents with FAISS and LangChain",
+    "Fine-tuned a BERT model for support ticket classification",
+    "Deployed a real-time anomaly detection service for video streams",
+    "Bachelor of Computer Science (Artificial Intelligence)",
+]
+
+def build_corpus(size: int):
+    """size distinct resume-like strings built from PHRASES."""
+    return [f"{PHRASES[i % len(PHRASES)]} ({i // len(PHRASES)})" for i in range(size)]
+
+def benchmark(size: int, backends=EMBEDDING_BACKENDS):
+    texts = build_corpus(size)
+    reference = None
+    print(f"\n📊 Encoding {size} texts with {MODEL_NAME} (batch size {EMBED_BATCH_SIZE})")
+    print(f"{'backend':<12}{'load s':>8}{'encode s':>10}{'texts/s':>10}{'min cos':>10}")
+    for backend in backends:
+        start = time.perf_counter()
+        model = get_model(MODEL_NAME, backend)
+        model.encode(["warmup"])
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        embs = model.encode(texts, batch_size=EMBED_BATCH_SIZE)
+        encode_time = time.perf_counter() - start
+
+        embs = embs / np.linalg.norm(embs, axis=1, keepdims=True)
+        if reference is None:
+            reference = embs
+        min_cosine = (embs * reference).sum(axis=1).min()
+        print(f"{backend:<12}{load_time:>8.2f}{encode_time:>10.2f}{size / encode_time:>10.0f}{min_cosine:>10.4f}")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000, sys.argv[2:] or EMBEDDING_BACKENDS)
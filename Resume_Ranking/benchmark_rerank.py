@@ -0,0 +1,50 @@
+import asyncio
+import copy
+import sys
+import time
+from itertools import combinations
+
+from llm_ranking import LLMListwiseRanker, LLMPairwiseSorter
+from test_ranking import CANDIDATE_REAL_DINESH, CANDIDATE_REAL_SHREETHAR, CANDIDATE_FAKE_SHREETHAR
+
+JD_CONTEXT = "Machine Learning Engineer Intern (0y exp)"
+
+def build_shortlist(size: int):
+    """Shortlist of distinct candidates derived from the test fixtures (varied experience)."""
+    base = [CANDIDATE_REAL_DINESH, CANDIDATE_REAL_SHREETHAR, CANDIDATE_FAKE_SHREETHAR]
+    shortlist = []
+    for i in range(size):
+        data = copy.deepcopy(base[i % len(base)])
+        for exp in data.get("experience", []):
+            exp["duration"] = round(exp["duration"] * (1 + i // len(base)), 2)
+        data["filename"] = f"{data['filename']} #{i + 1}"
+        shortlist.append({"filename": data["filename"], "extracted_data": data})
+    return shortlist
+
+def pair_agreement(order_a, order_b) -> float:
+    """Share of candidate pairs both orders rank the same way."""
+    pos = {c["filename"]: i for i, c in enumerate(order_b)}
+    pairs = list(combinations([c["filename"] for c in order_a], 2))
+    return sum(pos[x] < pos[y] for x, y in pairs) / len(pairs) if pairs else 1.0
+
+async def benchmark(size: int):
+    shortlist = build_shortlist(size)
+
+    start = time.perf_counter()
+    sorter = LLMPairwiseSorter(JD_CONTEXT)
+    merged = await sorter.merge_sort(copy.deepcopy(shortlist))
+    merge_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranker = LLMListwiseRanker(JD_CONTEXT)
+    listwise = await ranker.rank(copy.deepcopy(shortlist))
+    list_time = time.perf_counter() - start
+
+    print(f"\n📊 Reranking {size} candidates")
+    print(f"{'method':<12}{'calls':>8}{'prompt tok':>12}{'output tok':>12}{'seconds':>10}")
+    print(f"{'mergesort':<12}{sorter.comparison_count:>8}{sorter.prompt_tokens:>12}{sorter.completion_tokens:>12}{merge_time:>10.2f}")
+    print(f"{'listwise':<12}{ranker.call_count:>8}{ranker.prompt_tokens:>12}{ranker.completion_tokens:>12}{list_time:>10.2f}")
+    print(f"Pairwise agreement between the two orders: {pair_agreement(merged, listwise):.0%}")
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
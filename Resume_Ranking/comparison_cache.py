@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from storage import DB_PATH, connect, text_hash
+
+# Candidate hashes per SQLite IN (...) lookup
+LOOKUP_CHUNK = 500
+
+def candidate_key(candidate: Dict) -> str:
+    """Content address of a candidate as the comparison prompt sees it (extracted data only)."""
+    return text_hash(json.dumps(candidate.get("extracted_data", {}), sort_keys=True))
+
+class ComparisonCache:
+    """
+    Persistent pairwise-comparison results, keyed by (JD key, candidate A hash, candidate B hash).
+    The JD key covers the full parsed JD and the comparison prompt/model version
+    (see llm_ranking.comparison_key), so verdicts never carry over to a different JD or prompt.
+    Every verdict is stored in both orientations, so (B, A) is a hit after (A, B) was judged.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.conn = connect(db_path)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS comparisons ("
+                "jd_hash TEXT NOT NULL, a_hash TEXT NOT NULL, b_hash TEXT NOT NULL, "
+                "a_wins INTEGER NOT NULL, reasoning TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (jd_hash, a_hash, b_hash))"
+            )
+
+    def put(self, jd_hash: str, a_hash: str, b_hash: str, a_wins: bool, reasoning: str):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO comparisons VALUES (?, ?, ?, ?, ?, ?)",
+                [(jd_hash, a_hash, b_hash, int(a_wins), reasoning, now),
+                 (jd_hash, b_hash, a_hash, int(not a_wins), reasoning, now)],
+            )
+
+    def wins(self, jd_hash: str, candidates: Iterable[str]) -> List[Tuple[str, str, str]]:
+        """Recorded verdicts for a JD among the given candidates, as (winner, loser, reasoning) edges."""
+        candidates = list(set(candidates))
+        members = set(candidates)
+        edges = []
+        with self.lock:
+            for i in range(0, len(candidates), LOOKUP_CHUNK):
+                chunk = candidates[i:i + LOOKUP_CHUNK]
+                rows = self.conn.execute(
+                    "SELECT a_hash, b_hash, reasoning FROM comparisons "
+                    f"WHERE jd_hash = ? AND a_wins = 1 AND a_hash IN ({','.join('?' * len(chunk))})",
+                    [jd_hash, *chunk],
+                ).fetchall()
+                edges += [row for row in rows if row[1] in members]
+        return edges
+
+    def stats(self) -> Dict:
+        with self.lock:
+            pairs = self.conn.execute("SELECT COUNT(*) FROM comparisons").fetchone()[0] // 2
+            jds = self.conn.execute("SELECT COUNT(DISTINCT jd_hash) FROM comparisons").fetchone()[0]
+        return {"comparisons": pairs, "jds": jds}
+
+class ComparisonGraph:
+    """
+    In-memory view of the verdicts for one JD among the candidates being ranked, used to
+    answer a comparison without the LLM when it was judged before (directly) or is implied
+    by a chain A > X > ... > B (transitively). The transitive closure is kept up to date as
+    verdicts are recorded, so a lookup is a set membership test; chains are only traced
+    (BFS) to explain an inferred verdict. Without a jd_key nothing is read or persisted.
+    """
+
+    def __init__(self, cache: Optional[ComparisonCache], jd_key: Optional[str]):
+        self.cache = cache if jd_key else None
+        self.jd_hash = jd_key
+        self.beats: Dict[str, Dict[str, str]] = {}  # winner -> {loser: reasoning}
+        self.reach: Dict[str, Set[str]] = {}  # winner -> everyone it beats directly or transitively
+        self.loaded: Set[str] = set()
+
+    def load(self, candidates: Iterable[str]):
+        """Pulls stored verdicts among the given candidates (and those loaded before)."""
+        new = set(candidates) - self.loaded
+        if self.cache is None or not new:
+            return
+        self.loaded |= new
+        for winner, loser, reasoning in self.cache.wins(self.jd_hash, self.loaded):
+            if winner in new or loser in new:
+                self._add(winner, loser, reasoning)
+
+    def _add(self, winner: str, loser: str, reasoning: str):
+        self.beats.setdefault(winner, {})[loser] = reasoning
+        if loser in self.reach.get(winner, ()):
+            return
+        losers = {loser} | self.reach.get(loser, set())
+        for node in [winner] + [x for x, beaten in self.reach.items() if winner in beaten]:
+            self.reach.setdefault(node, set()).update(losers)
+
+    def path(self, start: str, goal: str) -> Optional[List[str]]:
+        """Shortest chain of recorded wins from start to goal (BFS), or None."""
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for nxt in self.beats.get(node, {}):
+                if nxt in parents:
+                    continue
+                parents[nxt] = node
+                if nxt == goal:
+                    chain = [goal]
+                    while parents[chain[-1]] is not None:
+                        chain.append(parents[chain[-1]])
+                    return chain[::-1]
+                queue.append(nxt)
+        return None
+
+    def lookup(self, a_hash: str, b_hash: str):
+        """
+        Returns (a_wins, reasoning, chain) for a known or implied verdict, else None.
+        chain is None for a direct verdict and the list of hashes for an inferred one.
+        """
+        if a_hash == b_hash:
+            return None
+        if b_hash in self.beats.get(a_hash, {}):
+            return True, self.beats[a_hash][b_hash], None
+        if a_hash in self.beats.get(b_hash, {}):
+            return False, self.beats[b_hash][a_hash], None
+        if b_hash in self.reach.get(a_hash, ()):
+            return True, None, self.path(a_hash, b_hash)
+        if a_hash in self.reach.get(b_hash, ()):
+            return False, None, self.path(b_hash, a_hash)
+        return None
+
+    def record(self, a_hash: str, b_hash: str, a_wins: bool, reasoning: str):
+        if a_hash == b_hash:
+            return
+        winner, loser = (a_hash, b_hash) if a_wins else (b_hash, a_hash)
+        self._add(winner, loser, reasoning)
+        if self.cache is not None:
+            self.cache.put(self.jd_hash, a_hash, b_hash, a_wins, reasoning)
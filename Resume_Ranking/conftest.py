@@ -0,0 +1,18 @@
+import pytest
+
+@pytest.fixture
+def stub_comparator(monkeypatch):
+    """
+    Replaces the LLM pairwise comparison with a deterministic one (the alphabetically
+    earlier extracted_data["name"] wins). Returns the list of compared (A, B) names.
+    """
+    import llm_ranking
+    calls = []
+
+    async def compare(cand_a, cand_b, jd_context, digest_a=None, digest_b=None):
+        a_name, b_name = cand_a["extracted_data"]["name"], cand_b["extracted_data"]["name"]
+        calls.append((a_name, b_name))
+        return {"winner": "A" if a_name < b_name else "B", "reasoning": "stub", "usage": {}}
+
+    monkeypatch.setattr(llm_ranking, "compare_two_candidates", compare)
+    return calls
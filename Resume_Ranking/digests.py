@@ -0,0 +1,92 @@
+import os
+from typing import Dict, List
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character estimate
+    tiktoken = None
+
+# Token budget for one candidate's digest in a comparison prompt
+DIGEST_MAX_TOKENS = int(os.getenv("DIGEST_MAX_TOKENS", 250))
+DIGEST_MAX_SKILLS = 30
+DIGEST_MAX_PROJECTS = 3
+DIGEST_PROJECT_WORDS = 30
+TOKENIZER_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+def get_encoding():
+    """tiktoken encoding, loaded once; None when tiktoken (or its BPE file) is unavailable."""
+    global _encoding
+    if _encoding is None:
+        _encoding = False
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                print(f"   ⚠️ Tokenizer unavailable, estimating tokens from characters: {e}")
+    return _encoding or None
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text to at most max_tokens tokens."""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def _words(text: str, limit: int) -> str:
+    words = (text or "").split()
+    return " ".join(words[:limit]) + (" ..." if len(words) > limit else "")
+
+def build_digest(resume_data: Dict, max_tokens: int = DIGEST_MAX_TOKENS) -> str:
+    """
+    Compact, bounded-token summary of a parsed resume for ranking prompts:
+    degree, total years, skills, roles, certifications and the top projects.
+    Most decisive fields come first, so token truncation drops the least useful text.
+    """
+    lines: List[str] = []
+    for edu in (resume_data.get("education") or [])[:2]:
+        degree = " in ".join(x for x in [edu.get("degree"), edu.get("course")] if x)
+        if degree:
+            lines.append(f"Degree: {degree}")
+
+    experience = resume_data.get("experience") or []
+    years = sum(float(exp.get("duration") or 0) for exp in experience)
+    roles = "; ".join(f"{exp.get('title') or 'Role'} ({float(exp.get('duration') or 0):.1f}y)" for exp in experience)
+    lines.append(f"Experience: {years:.1f} years" + (f" - {roles}" if roles else ""))
+
+    skills = resume_data.get("skills") or []
+    if skills:
+        lines.append("Skills: " + ", ".join(skills[:DIGEST_MAX_SKILLS]))
+    certifications = resume_data.get("certifications") or []
+    if certifications:
+        lines.append("Certifications: " + ", ".join(certifications))
+
+    for proj in (resume_data.get("projects") or [])[:DIGEST_MAX_PROJECTS]:
+        tech = ", ".join(proj.get("tech_stack") or [])
+        lines.append(
+            f"Project: {proj.get('title') or 'Untitled'}" + (f" [{tech}]" if tech else "")
+            + f" - {_words(proj.get('description'), DIGEST_PROJECT_WORDS)}"
+        )
+    return truncate_tokens("\n".join(lines), max_tokens)
+
+class CandidateDigests:
+    """Per-rerank memo: a candidate's digest is built once, however many comparisons it joins."""
+
+    def __init__(self, max_tokens: int = DIGEST_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self.digests: Dict[int, str] = {}
+
+    def __call__(self, candidate: Dict) -> str:
+        key = id(candidate)
+        if key not in self.digests:
+            self.digests[key] = build_digest(candidate.get("extracted_data") or {}, self.max_tokens)
+        return self.digests[key]
@@ -0,0 +1,266 @@
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from storage import CACHE_DIR, connect, normalize_text, text_hash
+
+# Eviction limits (entries, not bytes). Set the disk limit to 0 to keep the cache in RAM only.
+MAX_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", 50_000))
+MAX_DISK_ITEMS = int(os.getenv("EMBEDDING_CACHE_DISK_ITEMS", 500_000))
+INITIAL_CAPACITY = 1024
+# Keys per SQLite IN (...) lookup
+LOOKUP_CHUNK = 500
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache in front of a SentenceTransformer.
+
+    Tier 1: in-memory LRU of {hash: vector}.
+    Tier 2: float32 memory-mapped matrix (vectors.f32) plus a SQLite index
+            (index.db: hash -> row, last_used) that survives restarts.
+    Keys are (model name, normalized text) hashes, so models never share entries.
+    model may be None if a loader is given; it is then loaded on the first cache miss.
+
+    Writes are crash-safe: a row is claimed (and, when evicting, unlinked from its old
+    key) in one committed transaction before its vector is overwritten, and the new key
+    is only indexed after the vector is flushed. A crash in between leaks the claimed
+    rows but never leaves a key pointing at another text's vector. The index is shared
+    through SQLite, so several processes can use the same disk tier.
+    """
+
+    def __init__(self, model, model_name: str, cache_dir=CACHE_DIR,
+                 max_memory_items: int = MAX_MEMORY_ITEMS, max_disk_items: int = MAX_DISK_ITEMS,
+                 loader: Optional[Callable] = None):
+        self.model = model
+        self.loader = loader
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        self.dir = os.path.join(cache_dir, "embeddings", model_name.replace("/", "__"))
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.index_path = os.path.join(self.dir, "index.db")
+        self.conn = None
+        self.dim = None
+        self.capacity = 0  # rows currently mapped in this process
+        self.vectors = None
+        if self.max_disk_items > 0:
+            self._open_disk()
+            atexit.register(self.flush)
+
+    # ---------------- Disk tier ----------------
+
+    def _open_disk(self):
+        os.makedirs(self.dir, exist_ok=True)
+        self.conn = connect(self.index_path)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._refresh()
+
+    def _refresh(self):
+        """Picks up the dimension and size the matrix got here or from another process."""
+        dim, capacity = self._meta()
+        if self.dim is None:
+            self.dim = dim
+        self._map(capacity)
+
+    def _meta(self):
+        meta = dict(self.conn.execute("SELECT name, value FROM meta").fetchall())
+        return meta.get("dim"), meta.get("capacity", 0)
+
+    def _map(self, capacity: int):
+        """(Re)maps the matrix when it grew, here or in another process."""
+        if capacity <= self.capacity or not self.dim:
+            return
+        if self.vectors is not None:
+            self.vectors.flush()
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Reads indexed vectors and refreshes their recency. Runs as a write transaction, so
+        no other process can unlink and reuse a row (see _claim_rows) between the index
+        lookup and the vector read.
+        """
+        found = {}
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = {}
+            for i in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[i:i + LOOKUP_CHUNK]
+                rows.update(self.conn.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+            if not rows:
+                return {}
+            # Opened cold, or grown since: another process wrote these rows
+            if self.vectors is None or max(rows.values()) >= self.capacity:
+                self._refresh()
+            for key, row in rows.items():
+                found[key] = np.array(self.vectors[row])
+            now = time.time()
+            self.conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in rows])
+        return found
+
+    def _claim_rows(self, n: int) -> List[int]:
+        """
+        Takes n rows for new vectors in one committed transaction: free rows first, then
+        by growing the matrix (doubling, bounded by max_disk_items), then by unlinking
+        the least recently used tenth of the entries. No key points at a returned row.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            dim, capacity = self._meta()
+            if dim is None:
+                self.conn.execute("INSERT INTO meta VALUES ('dim', ?)", (self.dim,))
+            rows = [r for (r,) in self.conn.execute("SELECT row FROM free_rows LIMIT ?", (n,))]
+            self.conn.executemany("DELETE FROM free_rows WHERE row = ?", [(r,) for r in rows])
+            if len(rows) < n and capacity < self.max_disk_items:
+                new_capacity = min(max(INITIAL_CAPACITY, capacity * 2, capacity + n - len(rows)), self.max_disk_items)
+                with open(self.vectors_path, "ab") as f:
+                    f.truncate(new_capacity * self.dim * 4)
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('capacity', ?)", (new_capacity,))
+                grown = list(range(capacity, new_capacity))
+                take = n - len(rows)
+                rows += grown[:take]
+                self.conn.executemany("INSERT INTO free_rows VALUES (?)", [(r,) for r in grown[take:]])
+                capacity = new_capacity
+            if len(rows) < n:
+                oldest = self.conn.execute(
+                    "SELECT key, row FROM entries ORDER BY last_used LIMIT ?", (max(n - len(rows), capacity // 10),)
+                ).fetchall()
+                self.conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in oldest])
+                freed = [row for _, row in oldest]
+                take = n - len(rows)
+                rows += freed[:take]
+                self.conn.executemany("INSERT INTO free_rows VALUES (?)", [(r,) for r in freed[take:]])
+        self._map(capacity)
+        return rows
+
+    def _disk_put(self, items: Dict[str, np.ndarray]):
+        keys = list(items)[:self.max_disk_items]
+        rows = self._claim_rows(len(keys))
+        for key, row in zip(keys, rows):
+            self.vectors[row] = items[key]
+        self.vectors.flush()
+
+        now = time.time()
+        with self.conn:
+            for key, row in zip(keys, rows):
+                # Another process may have cached the same text meanwhile: give the row back
+                if not self.conn.execute("INSERT OR IGNORE INTO entries VALUES (?, ?, ?)", (key, row, now)).rowcount:
+                    self.conn.execute("INSERT INTO free_rows VALUES (?)", (row,))
+
+    def flush(self):
+        """Writes the memory-mapped matrix to disk (the index is committed as it changes)."""
+        with self.lock:
+            if self.vectors is not None:
+                self.vectors.flush()
+
+    # ---------------- Lookup ----------------
+
+    def _memory_put(self, key: str, vec: np.ndarray):
+        self.memory[key] = vec
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def encode(self, texts, batch_size: int = 32):
+        """Drop-in replacement for model.encode: only cache misses reach the model."""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        keys = [text_hash(t, self.model_name) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        with self.lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vec = self.memory.get(key)
+                if vec is None:
+                    missing[key] = normalize_text(text)
+                else:
+                    self.memory.move_to_end(key)
+                    self.hits_memory += 1
+                    found[key] = vec
+            if missing and self.conn is not None:
+                for key, vec in self._disk_get(list(missing)).items():
+                    del missing[key]
+                    found[key] = vec
+                    self._memory_put(key, vec)
+                    self.hits_disk += 1
+
+        if missing:
+            if self.model is None:
+                self.model = self.loader()
+            embs = self.model.encode(list(missing.values()), batch_size=batch_size)
+            with self.lock:
+                self.misses += len(missing)
+                if self.dim is None:
+                    self.dim = embs.shape[1]
+                new = {}
+                for key, vec in zip(missing, embs):
+                    vec = np.asarray(vec, dtype=np.float32)
+                    found[key] = new[key] = vec
+                    self._memory_put(key, vec)
+                if self.conn is not None:
+                    self._disk_put(new)
+
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        out = np.stack([found[k] for k in keys])
+        return out[0] if single else out
+
+    def stats(self) -> Dict:
+        """Hit rate and size counters for tuning the eviction limits."""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        disk_items, capacity = 0, 0
+        if self.conn is not None:
+            with self.lock:
+                disk_items = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                capacity = self._meta()[1]
+        return {
+            "model": self.model_name,
+            "lookups": lookups,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self.memory),
+            "max_memory_items": self.max_memory_items,
+            "disk_items": disk_items,
+            "max_disk_items": self.max_disk_items,
+            "disk_bytes": capacity * (self.dim or 0) * 4,
+        }
+
+# One cache per model name per process, so modules sharing a model share entries and files
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(model, model_name: str, loader: Optional[Callable] = None) -> EmbeddingCache:
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model, model_name, loader=loader)
+        return _caches[model_name]
+
+def cache_stats() -> List[Dict]:
+    return [c.stats() for c in _caches.values()]
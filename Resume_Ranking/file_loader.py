@@ -1,64 +1,208 @@
 import pymupdf  # PyMuPDF
 import pytesseract
-from pdf2image import convert_from_path
+from PIL import Image
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List
 
 # Extraction configuration
-MIN_TEXT_LENGTH = 300
+# Per-page OCR decision: a page is OCR'd when its text layer is essentially empty, or
+# when images cover most of it and it carries little native text (a scanned page).
+# Short native pages (a last page with one line, references) keep their text layer.
+EMPTY_PAGE_TEXT_LENGTH = 10
+MIN_PAGE_TEXT_LENGTH = 100
+SCANNED_IMAGE_COVERAGE = 0.5  # fraction of the page area covered by images
 OCR_DPI = 300
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+# "adaptive": try OCR_DPI_LOW first and re-render at OCR_DPI only when the mean
+# Tesseract word confidence is below OCR_MIN_CONFIDENCE. "fixed": always OCR_DPI.
+OCR_MODE = os.getenv("OCR_MODE", "adaptive")
+OCR_DPI_LOW = int(os.getenv("OCR_DPI_LOW", 150))
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", 75))
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+def open_pdf(source) -> pymupdf.Document:
+    """Opens a PDF from a path or from in-memory bytes (no temp file needed)."""
+    if isinstance(source, (bytes, bytearray)):
+        return pymupdf.open(stream=bytes(source), filetype="pdf")
+    return pymupdf.open(source)
 
 def extract_links(pdf_path: str) -> List[str]:
     """Gen4 Feature: Extracts embedded clickable URIs (links) from the PDF."""
-    links = []
     try:
-        doc = pymupdf.open(pdf_path)
-        for page in doc:
-            link_dicts = page.get_links()
-            for link in link_dicts:
-                if 'uri' in link:
-                    links.append(link['uri'])
-        doc.close()
+        with open_pdf(pdf_path) as doc:
+            return read_document(doc)["links"]
     except Exception as e:
         print(f"   ⚠️ Link Extraction Error: {e}")
-    return list(set(links))
+        return []
 
 def extract_text_native(pdf_path: str) -> str:
     """Extracts text directly from selectable PDF layers."""
-    text = ""
     try:
-        doc = pymupdf.open(pdf_path)
-        for page in doc:
-            text += page.get_text("text") + "\n"
-        doc.close()
+        with open_pdf(pdf_path) as doc:
+            return read_document(doc)["text"]
     except: return ""
-    return text.strip()
+
+def render_page(page: pymupdf.Page, dpi: int = OCR_DPI) -> Image.Image:
+    """Rasterizes a page through PyMuPDF (replaces a pdf2image round-trip)."""
+    pix = page.get_pixmap(dpi=dpi)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+def single_page_pdf(doc: pymupdf.Document, index: int) -> bytes:
+    """Copies one page into its own small PDF (cheap to ship to OCR workers)."""
+    with pymupdf.open() as out:
+        out.insert_pdf(doc, from_page=index, to_page=index)
+        return out.tobytes()
+
+def recognize(image: Image.Image):
+    """
+    Tesseract text plus mean word confidence (0-100) from its data output.
+    Words are regrouped into lines and blocks to rebuild the page text.
+    """
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if not word.strip() or conf < 0:
+            continue
+        confidences.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+
+    text, prev_block = "", None
+    for (block, _, _), words in lines.items():
+        if prev_block is not None and block != prev_block:
+            text += "\n"
+        text += " ".join(words) + "\n"
+        prev_block = block
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, confidence
+
+def ocr_page(page_pdf: bytes) -> Dict:
+    """
+    OCRs a single-page PDF. Top-level so worker processes can import it.
+    In adaptive mode the page is first rendered at OCR_DPI_LOW and only
+    re-rendered at OCR_DPI when recognition confidence is low.
+    Returns {"text", "dpi", "confidence"} so the DPI used can be benchmarked.
+    """
+    dpis = [OCR_DPI_LOW, OCR_DPI] if OCR_MODE == "adaptive" and OCR_DPI_LOW < OCR_DPI else [OCR_DPI]
+    best = {"text": "", "dpi": dpis[-1], "confidence": 0.0}
+    try:
+        with open_pdf(page_pdf) as doc:
+            for dpi in dpis:
+                text, confidence = recognize(render_page(doc[0], dpi))
+                if confidence >= best["confidence"]:
+                    best = {"text": text, "dpi": dpi, "confidence": round(confidence, 1)}
+                if confidence >= OCR_MIN_CONFIDENCE:
+                    break
+    except Exception as e:
+        print(f"   ⚠️ OCR Error: {e}")
+    return best
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """
+    Bounded process pool for OCR, created once on the first scanned page. Workers are
+    spawned, not forked: the API server is multithreaded, and forking it can copy held locks.
+    """
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _ocr_pool
+
+def ocr_pages(page_pdfs: List[bytes]) -> List[Dict]:
+    """OCRs single-page PDFs in parallel (inline for a single page or a single worker)."""
+    if len(page_pdfs) <= 1 or OCR_WORKERS <= 1:
+        return [ocr_page(p) for p in page_pdfs]
+    return list(get_ocr_pool().map(ocr_page, page_pdfs))
 
 def extract_text_ocr(pdf_path: str) -> str:
     """Fallback OCR extraction for scanned resume images."""
-    text = ""
     try:
-        images = convert_from_path(pdf_path, dpi=OCR_DPI)
-        for img in images:
-            text += pytesseract.image_to_string(img) + "\n"
+        with open_pdf(pdf_path) as doc:
+            return ocr_document(doc)
     except: return ""
-    return text.strip()
 
-def ingest_resume(pdf_path: str) -> Dict:
-    """Unified ingestion pipeline for text and digital footprint (URLs)."""
-    native_text = extract_text_native(pdf_path)
-    links = extract_links(pdf_path)
+def ocr_document(doc: pymupdf.Document) -> str:
+    """OCRs every page of an already open document."""
+    results = ocr_pages([single_page_pdf(doc, i) for i in range(len(doc))])
+    return "".join(r["text"] + "\n" for r in results).strip()
+
+def image_coverage(page: pymupdf.Page) -> float:
+    """Fraction of the page area covered by embedded images (overlaps counted twice, capped at 1)."""
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = sum(abs(pymupdf.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return min(1.0, covered / page_area)
+
+def needs_ocr(text: str, coverage: float) -> bool:
+    """True for pages without a usable text layer (see EMPTY_PAGE_TEXT_LENGTH / SCANNED_IMAGE_COVERAGE)."""
+    length = len(text.strip())
+    if length < EMPTY_PAGE_TEXT_LENGTH:
+        return True
+    return length < MIN_PAGE_TEXT_LENGTH and coverage >= SCANNED_IMAGE_COVERAGE
+
+def read_document(doc: pymupdf.Document) -> Dict:
+    """Single pass over an open document: per-page native text, image coverage and link URIs together."""
+    pages = []
+    coverage = []
+    links = []
+    for page in doc:
+        pages.append(page.get_text("text"))
+        coverage.append(image_coverage(page))
+        for link in page.get_links():
+            if 'uri' in link:
+                links.append(link['uri'])
+    return {"pages": pages, "image_coverage": coverage, "text": "".join(p + "\n" for p in pages).strip(), "links": list(set(links))}
+
+def ingest_resume_bytes(data: bytes) -> Dict:
+    """
+    Unified ingestion pipeline for an uploaded PDF held in memory.
+    The document is opened once; text and links come from the same handle, and
+    only pages without a usable text layer (see needs_ocr) are rasterized and OCR'd (in parallel).
+    "ocr_pages" records, per OCR'd page, the DPI used and the recognition confidence.
+    """
+    pages, coverage, links = [], [], []
+    try:
+        doc = open_pdf(data)
+    except Exception as e:
+        print(f"   ⚠️ PDF Open Error: {e}")
+        return {"text": "", "links": [], "used_ocr": False, "ocr_pages": []}
+
+    with doc:
+        try:
+            extracted = read_document(doc)
+            pages, coverage, links = extracted["pages"], extracted["image_coverage"], extracted["links"]
+        except Exception as e:
+            print(f"   ⚠️ Native Extraction Error: {e}")
 
-    if len(native_text) >= MIN_TEXT_LENGTH:
-        used_ocr = False
-        final_text = native_text
-    else:
-        ocr_text = extract_text_ocr(pdf_path)
-        used_ocr = True
-        final_text = ocr_text if len(ocr_text) > len(native_text) else native_text
+        # Per-page decision: keep the text layer where it exists
+        scanned = [i for i, (text, cov) in enumerate(zip(pages, coverage)) if needs_ocr(text, cov)]
+        ocr_results = []
+        if scanned:
+            try:
+                ocr_results = ocr_pages([single_page_pdf(doc, i) for i in scanned])
+            except Exception as e:
+                print(f"   ⚠️ OCR Error: {e}")
+            for i, res in zip(scanned, ocr_results):
+                if len(res["text"].strip()) > len(pages[i].strip()):
+                    pages[i] = res["text"]
 
     return {
-        "text": final_text,
+        "text": "".join(p + "\n" for p in pages).strip(),
         "links": links,
-        "used_ocr": used_ocr
-    }
\ No newline at end of file
+        "used_ocr": bool(scanned),
+        "ocr_pages": [{"page": i, "dpi": r["dpi"], "confidence": r["confidence"]} for i, r in zip(scanned, ocr_results)]
+    }
+
+def ingest_resume(pdf_path: str) -> Dict:
+    """Unified ingestion pipeline for text and digital footprint (URLs)."""
+    with open(pdf_path, "rb") as f:
+        return ingest_resume_bytes(f.read())
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from storage import CACHE_DIR, DB_PATH, connect
+
+# Jobs processed at the same time (files inside a job share the API's parse semaphore)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Uploaded documents wait here until their job has finished
+JOB_FILES_DIR = CACHE_DIR / "jobs"
+JOB_STAGES = ("ingested", "parsed", "scored", "reranked", "failed")
+
+class JobStore:
+    """
+    SQLite-backed job records: queued/running/done/failed status, per-stage progress
+    counts and the final result. Uploaded files are kept on disk, so a job survives
+    client disconnects and server restarts.
+    """
+
+    def __init__(self, db_path=DB_PATH, files_dir=JOB_FILES_DIR):
+        self.conn = connect(db_path)
+        self.lock = threading.Lock()
+        self.files_dir = files_dir
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, requisition_id TEXT NOT NULL, params TEXT NOT NULL, "
+                "status TEXT NOT NULL, progress TEXT NOT NULL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_files ("
+                "job_id TEXT NOT NULL, idx INTEGER NOT NULL, filename TEXT NOT NULL, path TEXT NOT NULL, "
+                "PRIMARY KEY (job_id, idx))"
+            )
+
+    def create(self, requisition_id: str, params: Dict, uploads: List[Tuple[str, bytes]]) -> str:
+        """Writes the uploads to disk and records a queued job; returns its ID."""
+        job_id = uuid.uuid4().hex
+        job_dir = self.files_dir / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        rows = []
+        for idx, (filename, content) in enumerate(uploads):
+            path = job_dir / f"{idx}.pdf"
+            path.write_bytes(content)
+            rows.append((job_id, idx, filename, str(path)))
+
+        progress = dict({stage: 0 for stage in JOB_STAGES}, total=len(uploads))
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, 'queued', ?, NULL, NULL, ?, ?)",
+                (job_id, requisition_id, json.dumps(params), json.dumps(progress), now, now),
+            )
+            self.conn.executemany("INSERT INTO job_files VALUES (?, ?, ?, ?)", rows)
+        return job_id
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT job_id, requisition_id, params, status, progress, error, created_at, updated_at, "
+                f"{'result' if with_result else 'NULL'} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        job = {
+            "job_id": row[0], "requisition_id": row[1], "params": json.loads(row[2]), "status": row[3],
+            "progress": json.loads(row[4]), "error": row[5], "created_at": row[6], "updated_at": row[7],
+        }
+        if with_result:
+            job["result"] = json.loads(row[8]) if row[8] else None
+        return job
+
+    def files(self, job_id: str) -> List[Tuple[str, str]]:
+        """(filename, stored path) of a job's uploads, in upload order."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT filename, path FROM job_files WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+
+    def pending(self) -> List[str]:
+        """Jobs to (re)start after a restart: queued, or interrupted while running."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def set_progress(self, job_id: str, progress: Dict):
+        self._update(job_id, progress=json.dumps(progress))
+
+    def start(self, job_id: str, progress: Dict):
+        self._update(job_id, status="running", progress=json.dumps(progress), error=None)
+
+    def _drop_files(self, job_id: str):
+        """Removes a finished or failed job's uploads (neither is ever run again)."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+        shutil.rmtree(self.files_dir / job_id, ignore_errors=True)
+
+    def finish(self, job_id: str, result: List[Dict]):
+        self._update(job_id, status="done", result=json.dumps(result))
+        self._drop_files(job_id)
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error)
+        self._drop_files(job_id)
+
+class JobProgress:
+    """Per-stage counters of a running job, persisted at most every FLUSH_SECONDS."""
+    FLUSH_SECONDS = 0.5
+
+    def __init__(self, store: JobStore, job_id: str, total: int):
+        self.store = store
+        self.job_id = job_id
+        self.counts = dict({stage: 0 for stage in JOB_STAGES}, total=total)
+        self.flushed_at = 0.0
+
+    def advance(self, stage: str, n: int = 1):
+        self.counts[stage] += n
+        if time.time() - self.flushed_at >= self.FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self.flushed_at = time.time()
+        self.store.set_progress(self.job_id, self.counts)
+
+class JobQueue:
+    """
+    In-process worker pool over a JobStore (no outside broker). The runner coroutine
+    does the actual work: runner(job, progress) -> result list, calling
+    progress.advance(stage) as files move on; the queue persists status, result and failures.
+    """
+
+    def __init__(self, store: JobStore, runner: Callable[[Dict, JobProgress], Awaitable[List[Dict]]],
+                 workers: int = JOB_WORKERS):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Starts the workers and re-enqueues jobs left unfinished by a previous run."""
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        pending = self.store.pending()
+        for job_id in pending:
+            self.queue.put_nowait(job_id)
+        if pending:
+            print(f"   ↻ Resuming {len(pending)} unfinished jobs")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, job_id: str):
+        self.queue.put_nowait(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or job["status"] in ("done", "failed"):
+            return
+        progress = JobProgress(self.store, job_id, job["progress"]["total"])
+        self.store.start(job_id, progress.counts)
+        try:
+            result = await self.runner(job, progress)
+        except Exception as e:
+            print(f"   ⚠️ Job {job_id} failed: {e}")
+            self.store.fail(job_id, str(e))
+        else:
+            progress.flush()
+            self.store.finish(job_id, result)
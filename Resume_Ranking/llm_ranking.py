@@ -1,16 +1,48 @@
+import asyncio
 import json
-from typing import Dict, List
-from ats_parsers import client, MODEL
+import os
+from typing import Dict, List, Optional
+from ats_parsers import async_client, MODEL
+from comparison_cache import ComparisonCache, ComparisonGraph, candidate_key
+from storage import json_hash
+from digests import CandidateDigests, build_digest, count_tokens
 
-async def compare_two_candidates(cand_a: Dict, cand_b: Dict, jd_context: str) -> Dict:
+# Max pairwise LLM comparisons in flight during a rerank
+RERANK_CONCURRENCY = int(os.getenv("RERANK_CONCURRENCY", 8))
+# Listwise reranking: candidates judged per call, and how far the window slides (overlap = window - step)
+LISTWISE_WINDOW = int(os.getenv("LISTWISE_WINDOW", 5))
+LISTWISE_STEP = int(os.getenv("LISTWISE_STEP", 3))
+
+# Bump when the comparison prompt or digests change, so cached verdicts are not reused
+COMPARISON_VERSION = 1
+
+def comparison_key(jd_data: Dict) -> str:
+    """Comparison-cache key for a parsed JD: the full JD plus the model and prompt version."""
+    return json_hash(jd_data, namespace=f"{MODEL}:{COMPARISON_VERSION}")
+
+def token_usage(res, prompt: str) -> Dict:
+    """Prompt/completion token counts of a chat completion (prompt counted locally if the provider omits it)."""
+    usage = getattr(res, "usage", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or count_tokens(prompt),
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+def log_prompt_tokens(calls: int, prompt_tokens: int):
+    print(f"Total Prompt Tokens: {prompt_tokens} (avg {prompt_tokens / calls if calls else 0:.0f} per call)")
+
+async def compare_two_candidates(cand_a: Dict, cand_b: Dict, jd_context: str, digest_a: Optional[str] = None, digest_b: Optional[str] = None) -> Dict:
     """
     Gen 4 Feature: Pairwise head-to-head comparison logic with structured reasoning.
-    Returns: {"winner": "A" or "B", "reasoning": "Short explanation"}
+    Candidates are described by compact digests (see digests.py), prebuilt by the sorters.
+    Returns: {"winner": "A" or "B", "reasoning": "Short explanation", "usage": token counts}
     """
+    digest_a = digest_a or build_digest(cand_a.get('extracted_data') or {})
+    digest_b = digest_b or build_digest(cand_b.get('extracted_data') or {})
     prompt = (
         f"Job Description: {jd_context}\n\n"
-        f"Candidate A: {json.dumps(cand_a.get('extracted_data', {}))}\n"
-        f"Candidate B: {json.dumps(cand_b.get('extracted_data', {}))}\n\n"
+        f"Candidate A:\n{digest_a}\n\n"
+        f"Candidate B:\n{digest_b}\n\n"
         "Compare these two candidates based on:"
         "1. Skill relevance to the specific JD.\n"
         "2. Depth of experience (years + focus).\n"
@@ -23,39 +55,126 @@ async def compare_two_candidates(cand_a: Dict, cand_b: Dict, jd_context: str) ->
     )
     
     try:
-        res = client.chat.completions.create(model=MODEL, messages=[{"role": "user", "content": prompt}], response_format={"type": "json_object"}, temperature=0)
+        res = await async_client.chat.completions.create(model=MODEL, messages=[{"role": "user", "content": prompt}], response_format={"type": "json_object"}, temperature=0)
         data = json.loads(res.choices[0].message.content)
         # Fallback if keys missing
         if "winner" not in data: data["winner"] = "A"
         if "reasoning" not in data: data["reasoning"] = "No reasoning provided."
+        data["usage"] = token_usage(res, prompt)
         return data
     except Exception as e: 
         print(f"LLM Error: {e}")
-        return {"winner": "A", "reasoning": "Error in comparison, defaulted to A."}
+        return {"winner": "A", "reasoning": "Error in comparison, defaulted to A.", "error": True}
 
-async def generate_explanation(candidate: Dict, jd_context: str) -> str:
+async def rank_window(candidates: List[Dict], jd_context: str, digests: Optional[List[str]] = None) -> Dict:
+    """
+    Listwise judgement: ranks a small window of candidates in a single call.
+    Returns: {"order": window indices best first, "reasoning": "Short explanation", "usage": token counts}
+    """
+    digests = digests or [build_digest(c.get('extracted_data') or {}) for c in candidates]
+    listing = "\n\n".join(f"[{i + 1}]\n{digest}" for i, digest in enumerate(digests))
+    prompt = (
+        f"Job Description: {jd_context}\n\n"
+        f"Candidates:\n{listing}\n\n"
+        "Rank these candidates from best to worst fit based on:"
+        "1. Skill relevance to the specific JD.\n"
+        "2. Depth of experience (years + focus).\n"
+        "3. Quality of projects/achievements.\n\n"
+        "Return a JSON object with two keys:\n"
+        f"- 'ranking': a list of all {len(candidates)} candidate numbers, best first, e.g. [2, 1, 3]\n"
+        "- 'reasoning': 'A concise 1-sentence explanation of the top choice.'\n"
+        "JSON ONLY."
+    )
+    
+    try:
+        res = await async_client.chat.completions.create(model=MODEL, messages=[{"role": "user", "content": prompt}], response_format={"type": "json_object"}, temperature=0)
+        data = json.loads(res.choices[0].message.content)
+        # Keep valid, unique numbers; anyone the model left out keeps their relative order at the end
+        order = []
+        for number in data.get("ranking", []):
+            try:
+                idx = int(number) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= idx < len(candidates) and idx not in order:
+                order.append(idx)
+        order += [i for i in range(len(candidates)) if i not in order]
+        return {"order": order, "reasoning": data.get("reasoning", "No reasoning provided."), "usage": token_usage(res, prompt)}
+    except Exception as e:
+        print(f"LLM Error: {e}")
+        return {"order": list(range(len(candidates))), "reasoning": "Error in ranking, kept input order.", "error": True}
+
+async def generate_explanation(candidate: Dict, jd_context: str, rank_label: Optional[str] = None) -> str:
     """On-demand Explainability: Generates reasoning only when triggered via API."""
-    prompt = f"Explain ranking for {candidate['filename']} against JD: {jd_context}. Scores: {candidate['rank_score']}"
-    res = client.chat.completions.create(model=MODEL, messages=[{"role": "system", "content": "XAI Analyst."}, {"role": "user", "content": prompt}], temperature=0)
+    # API candidates carry filename/rank_score; pipeline candidates carry id/final_numeric_score
+    name = candidate.get('filename', candidate.get('id'))
+    score = candidate.get('rank_score', candidate.get('final_numeric_score'))
+    prompt = f"Explain ranking for {name} against JD: {jd_context}. Scores: {score}"
+    if rank_label:
+        prompt += f". Outcome: {rank_label}"
+    res = await async_client.chat.completions.create(model=MODEL, messages=[{"role": "system", "content": "XAI Analyst."}, {"role": "user", "content": prompt}], temperature=0)
     return res.choices[0].message.content
 
 class LLMPairwiseSorter:
-    def __init__(self, jd_context: str):
+    """
+    LLM merge sort. Independent sub-sorts (and therefore independent merges at the
+    same recursion depth) run concurrently, bounded by max_concurrency in-flight
+    comparisons, so wall-clock time is ~2n sequential comparisons instead of n log n.
+    """
+    def __init__(self, jd_context: str, max_concurrency: int = RERANK_CONCURRENCY, cache: Optional[ComparisonCache] = None, jd_key: Optional[str] = None):
         self.jd_context = jd_context
-        self.comparison_count = 0
+        self.comparison_count = 0  # LLM calls actually made
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = 0
+        self.inferred_count = 0
+        self.limiter = asyncio.Semaphore(max_concurrency)
+        # Earlier verdicts for this JD (persisted when a cache and jd_key, see comparison_key,
+        # are given) answer repeat and implied pairs
+        self.graph = ComparisonGraph(cache, jd_key)
+        self.names = {}  # candidate hash -> filename, for readable inference chains
+        self.digest = CandidateDigests()
+
+    def preload(self, candidates):
+        """Loads stored verdicts among the candidates about to be compared."""
+        self.graph.load(candidate_key(c) for c in candidates)
 
     async def is_stronger(self, cand_a, cand_b):
         """
         Determines if cand_a is stronger than cand_b using LLM comparison.
+        Pairs judged before, or implied by a chain of earlier wins, skip the LLM.
         Returns True if cand_a is the winner.
         """
-        self.comparison_count += 1
-        
-        print(f"Comparison #{self.comparison_count}: {cand_a['filename']} vs {cand_b['filename']}")
+        key_a, key_b = candidate_key(cand_a), candidate_key(cand_b)
+        self.names[key_a], self.names[key_b] = cand_a['filename'], cand_b['filename']
         
-        res = await compare_two_candidates(cand_a, cand_b, self.jd_context)
-        winner = res.get("winner", "A")
-        reasoning = res.get("reasoning", "No advice")
+        known = self.graph.lookup(key_a, key_b)
+        if known is not None:
+            a_wins, reasoning, chain = known
+            winner = "A" if a_wins else "B"
+            if chain:
+                self.inferred_count += 1
+                source = "inferred"
+                reasoning = "Implied by earlier comparisons: " + " > ".join(self.names.get(k, "another candidate") for k in chain)
+            else:
+                self.cache_hits += 1
+                source = "cache"
+            print(f"Cached ({source}): {cand_a['filename']} vs {cand_b['filename']}")
+        else:
+            self.comparison_count += 1
+            source = "llm"
+            print(f"Comparison #{self.comparison_count}: {cand_a['filename']} vs {cand_b['filename']}")
+            
+            async with self.limiter:
+                res = await compare_two_candidates(cand_a, cand_b, self.jd_context, self.digest(cand_a), self.digest(cand_b))
+            winner = res.get("winner", "A")
+            reasoning = res.get("reasoning", "No advice")
+            usage = res.get("usage", {})
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            print(f"   -> Prompt tokens: {usage.get('prompt_tokens', 0)}")
+            if not res.get("error"):
+                self.graph.record(key_a, key_b, winner == "A", reasoning)
         
         print(f"   -> Winner: {winner} ({cand_a['filename'] if winner == 'A' else cand_b['filename']})")
         print(f"   -> Reason: {reasoning}")
@@ -67,12 +186,14 @@ class LLMPairwiseSorter:
         cand_a["match_history"].append({
             "opponent": cand_b['filename'],
             "outcome": "WON" if winner == "A" else "LOST",
-            "reason": reasoning
+            "reason": reasoning,
+            "source": source
         })
         cand_b["match_history"].append({
             "opponent": cand_a['filename'],
             "outcome": "LOST" if winner == "A" else "WON",
-            "reason": reasoning
+            "reason": reasoning,
+            "source": source
         })
 
         # Logic: If A wins, return True (A is stronger). 
@@ -115,8 +236,8 @@ class LLMPairwiseSorter:
         right_half = items[mid:]
 
         # Recursive Calls (Keep dividing until we hit single items)
-        left_sorted = await self.merge_sort(left_half)
-        right_sorted = await self.merge_sort(right_half)
+        # The halves share no candidates, so they are sorted concurrently.
+        left_sorted, right_sorted = await asyncio.gather(self.merge_sort(left_half), self.merge_sort(right_half))
 
         # Conquer (Merge step)
         names_left = [c['filename'] for c in left_sorted]
@@ -125,14 +246,157 @@ class LLMPairwiseSorter:
         
         return await self.merge(left_sorted, right_sorted)
 
-async def rank_candidates_with_mergesort(candidates: list, jd_context: str) -> list:
+    async def insert(self, ranked: list, candidate) -> int:
+        """
+        Binary-search insertion into an already ranked list (best first):
+        ~log2(n) comparisons, the existing order is left untouched. Returns the index.
+        """
+        lo, hi = 0, len(ranked)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if await self.is_stronger(candidate, ranked[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        ranked.insert(lo, candidate)
+        return lo
+
+async def rank_candidates_with_mergesort(candidates: list, jd_context: str, max_concurrency: int = RERANK_CONCURRENCY, cache: Optional[ComparisonCache] = None, jd_key: Optional[str] = None) -> list:
     """Wrapper function to instantiate Sorter and run merge sort."""
     if not candidates:
         return []
     
     print(f"\nStarting LLM Merge Sort on {len(candidates)} candidates...")
-    sorter = LLMPairwiseSorter(jd_context)
+    sorter = LLMPairwiseSorter(jd_context, max_concurrency, cache, jd_key)
+    sorter.preload(candidates)
     sorted_candidates = await sorter.merge_sort(candidates)
-    print(f"Total Comparisons Made: {sorter.comparison_count}")
+    print(f"Total Comparisons Made: {sorter.comparison_count} (cache hits: {sorter.cache_hits}, inferred: {sorter.inferred_count})")
+    log_prompt_tokens(sorter.comparison_count, sorter.prompt_tokens)
+    
+    return sorted_candidates
+
+async def insert_candidates_into_ranking(ranked: list, new_candidates: list, jd_context: str, max_concurrency: int = RERANK_CONCURRENCY, cache: Optional[ComparisonCache] = None, jd_key: Optional[str] = None) -> list:
+    """Inserts new candidates one by one into an existing ranking (O(new * log n) comparisons)."""
+    ranked = list(ranked)
+    if not new_candidates:
+        return ranked
+    
+    print(f"\nInserting {len(new_candidates)} candidates into a ranking of {len(ranked)}...")
+    sorter = LLMPairwiseSorter(jd_context, max_concurrency, cache, jd_key)
+    sorter.preload(ranked + list(new_candidates))
+    for cand in new_candidates:
+        position = await sorter.insert(ranked, cand)
+        print(f"--- {cand['filename']} inserted at position {position + 1} ---")
+    print(f"Total Comparisons Made: {sorter.comparison_count} (cache hits: {sorter.cache_hits}, inferred: {sorter.inferred_count})")
+    log_prompt_tokens(sorter.comparison_count, sorter.prompt_tokens)
+    
+    return ranked
+
+class LLMListwiseRanker:
+    """
+    Sliding-window listwise reranking. Windows of `window` candidates are ranked in one
+    call each, moving from the bottom of the seed order to the top; consecutive windows
+    overlap by window - step, so a strong candidate is carried upwards across windows.
+    One pass costs ceil((n - window) / step) + 1 calls instead of ~n log2 n pairwise calls.
+    Windows depend on the previous one's result, so they run sequentially.
+    """
+    def __init__(self, jd_context: str, window: int = LISTWISE_WINDOW, step: int = LISTWISE_STEP):
+        self.jd_context = jd_context
+        self.window = max(2, window)
+        self.step = max(1, min(step, self.window - 1))
+        self.call_count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.digest = CandidateDigests()
+
+    async def rank(self, items):
+        ranked = list(items)
+        end = len(ranked)
+        while len(ranked) > 1:
+            start = max(0, end - self.window)
+            window = ranked[start:end]
+            self.call_count += 1
+            print(f"Window #{self.call_count}: {[c['filename'] for c in window]}")
+            
+            res = await rank_window(window, self.jd_context, [self.digest(c) for c in window])
+            usage = res.get("usage", {})
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            print(f"   -> Prompt tokens: {usage.get('prompt_tokens', 0)}")
+            ranked[start:end] = [window[i] for i in res["order"]]
+            print(f"   -> Order: {[c['filename'] for c in ranked[start:end]]}")
+            print(f"   -> Reason: {res['reasoning']}")
+            
+            if start == 0:
+                break
+            end -= self.step
+        return ranked
+
+async def rank_candidates_listwise(candidates: list, jd_context: str, window: int = LISTWISE_WINDOW, step: int = LISTWISE_STEP) -> list:
+    """Wrapper function to instantiate the listwise ranker and run one sliding-window pass."""
+    if not candidates:
+        return []
+    
+    print(f"\nStarting LLM Listwise Ranking on {len(candidates)} candidates...")
+    ranker = LLMListwiseRanker(jd_context, window, step)
+    ranked = await ranker.rank(candidates)
+    print(f"Total Listwise Calls Made: {ranker.call_count}")
+    log_prompt_tokens(ranker.call_count, ranker.prompt_tokens)
+    
+    return ranked
+
+class LLMTournamentSelector(LLMPairwiseSorter):
+    """
+    Partial ranking: finds and orders only the top K by repeated knockout tournaments.
+    After each pick, the next one can only be a candidate whose recorded losses are all
+    against already-picked candidates, so later tournaments are ~log n wide.
+    Total comparisons ~ n + K log n instead of n log n for a full sort.
+    """
+    def __init__(self, jd_context: str, max_concurrency: int = RERANK_CONCURRENCY, cache: Optional[ComparisonCache] = None, jd_key: Optional[str] = None):
+        super().__init__(jd_context, max_concurrency, cache, jd_key)
+        self.beaten_by = {}  # id(candidate) -> ids of candidates that beat it
+
+    async def play(self, cand_a, cand_b):
+        """One match; returns the winner and records who beat the loser."""
+        if await self.is_stronger(cand_a, cand_b):
+            winner, loser = cand_a, cand_b
+        else:
+            winner, loser = cand_b, cand_a
+        self.beaten_by.setdefault(id(loser), set()).add(id(winner))
+        return winner
+
+    async def knockout(self, players):
+        """Single-elimination bracket; all matches of a round run concurrently."""
+        while len(players) > 1:
+            winners = await asyncio.gather(*(self.play(players[i], players[i + 1]) for i in range(0, len(players) - 1, 2)))
+            if len(players) % 2:
+                winners.append(players[-1])  # bye
+            players = list(winners)
+        return players[0]
+
+    async def select_top_k(self, items, k):
+        selected_ids = set()
+        top = []
+        while len(top) < min(k, len(items)):
+            remaining = [c for c in items if id(c) not in selected_ids]
+            # Anyone who lost to an unpicked candidate cannot be the next best
+            contenders = [c for c in remaining if self.beaten_by.get(id(c), set()) <= selected_ids]
+            champion = await self.knockout(contenders or remaining)
+            top.append(champion)
+            selected_ids.add(id(champion))
+        return top
+
+async def rank_top_k_with_tournament(candidates: list, jd_context: str, k: int, max_concurrency: int = RERANK_CONCURRENCY, cache: Optional[ComparisonCache] = None, jd_key: Optional[str] = None) -> list:
+    """Orders only the top k candidates with LLM tournaments; the rest keep their seed order."""
+    if not candidates:
+        return []
+    
+    print(f"\nStarting LLM Top-{k} Tournament on {len(candidates)} candidates...")
+    selector = LLMTournamentSelector(jd_context, max_concurrency, cache, jd_key)
+    selector.preload(candidates)
+    top = await selector.select_top_k(candidates, k)
+    top_ids = {id(c) for c in top}
+    print(f"Total Comparisons Made: {selector.comparison_count} (cache hits: {selector.cache_hits}, inferred: {selector.inferred_count})")
+    log_prompt_tokens(selector.comparison_count, selector.prompt_tokens)
     
-    return sorted_candidates
\ No newline at end of file
+    return top + [c for c in candidates if id(c) not in top_ids]
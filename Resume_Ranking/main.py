@@ -1,61 +1,53 @@
-import os, asyncio, json
-from fastapi import FastAPI, UploadFile, File, Form, Body
+import asyncio, json
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, UploadFile, File, Form, Body, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional, Callable, Union
 
-from file_loader import ingest_resume
-from ats_parsers import parse_jd, parse_resume
-from scoring import check_hard_constraints, calculate_hybrid_score
-from llm_ranking import compare_two_candidates, generate_explanation, rank_candidates_with_mergesort
+from ats_parsers import aparse_jd, aparse_resume, enrich_skills, jd_parse_version, resume_parse_version
+from scoring import DEFAULT_WEIGHTS, MODEL_NAME, check_hard_constraints
+from model_registry import warmup
+from stage_executor import StageExecutor
+from llm_ranking import comparison_key, generate_explanation, rank_candidates_with_mergesort, rank_top_k_with_tournament, insert_candidates_into_ranking, rank_candidates_listwise
+from embedding_cache import cache_stats
+from comparison_cache import ComparisonCache
+from requisitions import RequisitionStore, drop_reuploads
+from resume_cache import ResumeCache, file_hash
+from storage import text_hash
+from jobs import JobStore, JobQueue, JobProgress
 
-app = FastAPI(title="Gen4 High-Performance ATS")
-semaphore = asyncio.Semaphore(10)
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Embedding model, CPU stage workers (process mode loads the model in each one now),
+    # then background job workers (and resumption of jobs interrupted by a restart)
+    if stages.mode == "thread":
+        await asyncio.to_thread(warmup, [MODEL_NAME])
+    await asyncio.to_thread(stages.start)
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    stages.shutdown()
 
-# Reuseable Pipeline Helper
-async def process_resume_files(files: List[UploadFile], jd_text: str, jd_data: dict, jd_summary: str):
-    """Core pipeline: Ingest -> Parse -> Score"""
-    
-    async def process_task(file: UploadFile):
-        async with semaphore:
-            temp_path = f"temp_{file.filename}"
-            # Ensure we read file content safely. If file is closed/seeked, it might need management.
-            # Best practice: read into bytes immediately if fitting in RAM, or manage temp files carefully.
-            content = await file.read()
-            with open(temp_path, "wb") as buffer: buffer.write(content)
-            
-            try:
-                ingested = ingest_resume(temp_path)
-                resume_data = parse_resume(ingested["text"], jd_summary, ingested["links"])
-                
-                # Check constraints
-                constraint = check_hard_constraints(resume_data, jd_data)
-                
-                # Calculate scores
-                scores = calculate_hybrid_score(resume_data, jd_data)
-                
-                return {
-                    "filename": file.filename, 
-                    "status": "QUALIFIED" if constraint["pass"] else "REJECTED", 
-                    "logic_reason": constraint["reason"], 
-                    "rank_score": scores["total_score"], 
-                    "breakdown": scores["breakdown"], 
-                    "extracted_data": resume_data
-                }
-            except Exception as e: return {"filename": file.filename, "error": str(e)}
-            finally: 
-                if os.path.exists(temp_path): os.remove(temp_path)
-
-    tasks = [process_task(f) for f in files]
-    results = await asyncio.gather(*tasks)
-    return results
+app = FastAPI(title="Gen4 High-Performance ATS", lifespan=lifespan)
+semaphore = asyncio.Semaphore(10)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"], expose_headers=["X-Requisition-ID"])
+requisitions = RequisitionStore()
+resume_cache = ResumeCache(parse_version=resume_parse_version())
+# Where ingestion and scoring run (threads or a process pool, see STAGE_EXECUTOR)
+stages = StageExecutor()
+comparisons = ComparisonCache()
+RERANK_METHODS = ("mergesort", "listwise")
+# Cache context for JD-agnostic parses (see ats_parsers.parse_resume)
+CANONICAL_CONTEXT = ""
+# Parsed JDs are cached per JD text and parser version (model, prompt, schema)
+JD_PARSE_VERSION = jd_parse_version()
 
-# Endpoint 1: Hybrid Score Only (Batch)
-@app.post("/score-candidates/")
-async def score_candidates(job_description: str = Form(...), files: List[UploadFile] = File(...)):
-    print(f"🚀 Endpoint 1: Scoring {len(files)} resumes...")
-    jd_data = parse_jd(job_description)
-    
+# JD Helpers: parse once per distinct JD text, refer to it by requisition afterwards
+def summarize_jd(jd_data: dict) -> str:
+    """One-line JD context used in LLM prompts."""
     # Handle optional fields and nested structure safely
     # Schema doesn't have 'title', uses 'role_level'. Experience is nested.
     role_level = jd_data.get('role_level', 'Unknown Role')
@@ -64,37 +56,135 @@ async def score_candidates(job_description: str = Form(...), files: List[UploadF
     if jd_data.get('experience'):
         min_exp = jd_data.get('experience', {}).get('min_years') or "0"
         
-    jd_summary = f"{role_level} ({min_exp}y exp)"
-    
-    results = await process_resume_files(files, job_description, jd_data, jd_summary)
-    
-    # Simple semantic sort (descending)
-    qualified = sorted([r for r in results if r.get("status") == "QUALIFIED"], key=lambda x: x["rank_score"], reverse=True)
-    rejected = [r for r in results if r.get("status") == "REJECTED"]
-    
-    return qualified + rejected
+    return f"{role_level} ({min_exp}y exp)"
 
-# Endpoint 2: Rerank with SPPR (Top 8)
-@app.post("/rerank-candidates/")
-async def rerank_candidates(job_description: str = Form(...), files: List[UploadFile] = File(...)):
-    print(f"🚀 Endpoint 2: SPPR Reranking {len(files)} resumes...")
-    jd_data = parse_jd(job_description)
+async def get_parsed_jd(job_description: str) -> dict:
+    """Parsed JD from the persistent cache (normalized text hash + parser version), else one LLM parse."""
+    jd_hash = text_hash(job_description, namespace=JD_PARSE_VERSION)
+    jd_data = requisitions.get_parsed_jd(jd_hash)
+    if jd_data is None:
+        jd_data = await aparse_jd(job_description)
+        if jd_data is None:
+            raise HTTPException(status_code=502, detail="Failed to parse job description")
+        requisitions.put_parsed_jd(jd_hash, jd_data)
+    return jd_data
 
-    # Handle optional fields and nested structure safely
-    role_level = jd_data.get('role_level', 'Unknown Role')
-    min_exp = "0"
-    if jd_data.get('experience'):
-        min_exp = jd_data.get('experience', {}).get('min_years') or "0"
-        
-    jd_summary = f"{role_level} ({min_exp}y exp)"
-    
-    # 1. Process & Score (Seed Sort)
-    results = await process_resume_files(files, job_description, jd_data, jd_summary)
+async def resolve_jd(job_description: Optional[str], requisition_id: Optional[str]):
+    """
+    Returns (jd_data, requisition_id). A JD text is parsed (or read from cache) and
+    registered under the given or a new requisition (an existing one must have the same JD);
+    a bare requisition_id loads its stored JD.
+    """
+    if job_description:
+        jd_data = await get_parsed_jd(job_description)
+        registered = requisitions.register(jd_data, requisition_id)
+        if registered is None:
+            raise HTTPException(status_code=409, detail="requisition_id is registered to a different job description")
+        return jd_data, registered
+    if requisition_id:
+        jd_data = requisitions.get_jd(requisition_id)
+        if jd_data is None:
+            raise HTTPException(status_code=404, detail="Unknown requisition_id")
+        return jd_data, requisition_id
+    raise HTTPException(status_code=400, detail="Provide job_description or requisition_id")
+
+# Reuseable Pipeline Helpers
+async def parse_resume_file(filename: str, content: Union[bytes, Path], jd_data: dict, on_stage: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Ingest -> Parse -> Constraint check for one uploaded document (no scoring).
+    content is the document bytes, or a Path read only once a parse slot is free
+    (so a large job never holds every document in memory at once).
+    on_stage, if given, is called with "ingested" and "parsed" as the document gets there.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    async with semaphore:
+        # Work on the uploaded bytes directly: no temp files, so concurrent
+        # uploads sharing a filename cannot collide.
+        try:
+            if isinstance(content, Path):
+                content = await asyncio.to_thread(content.read_bytes)
+            # Repeat uploads of the same document skip ingestion and parsing
+            fhash = file_hash(content)
+            ingested = resume_cache.get_ingestion(fhash)
+            if ingested is None:
+                # PyMuPDF/Tesseract are blocking: keep them off the event loop
+                ingested = await stages.ingest(content)
+                if ingested["text"]:
+                    resume_cache.put_ingestion(fhash, ingested)
+            on_stage("ingested")
+
+            # Canonical (JD-agnostic) parse: one LLM call serves every requisition
+            resume_data = resume_cache.get_parsed(fhash, CANONICAL_CONTEXT)
+            if resume_data is None:
+                resume_data = await aparse_resume(ingested["text"], None, ingested["links"])
+                if resume_data is not None:
+                    resume_cache.put_parsed(fhash, CANONICAL_CONTEXT, resume_data)
+            on_stage("parsed")
+
+            # JD-specific skill inference without another LLM round-trip
+            resume_data = enrich_skills(resume_data, jd_data)
+            
+            # Check constraints
+            constraint = check_hard_constraints(resume_data, jd_data)
+            
+            return {
+                "filename": filename, 
+                "file_hash": fhash,
+                "status": "QUALIFIED" if constraint["pass"] else "REJECTED", 
+                "logic_reason": constraint["reason"], 
+                "extracted_data": resume_data
+            }
+        except Exception as e: return {"filename": filename, "error": str(e)}
+
+async def score_batch(results: List[dict], jd_data: dict):
+    """
+    Scores parsed results in shared embedding batches against the JD profile
+    (JD embeddings are cached across requests). Returns (results, feature rows to persist).
+    """
+    parsed = [r for r in results if "error" not in r]
+    if not parsed:
+        return results, []
+    try:
+        scores = await stages.score([r["extracted_data"] for r in parsed], jd_data)
+    except Exception as e:
+        return [r if "error" in r else {"filename": r["filename"], "error": str(e)} for r in results], []
+
+    for r, s in zip(parsed, scores):
+        r["rank_score"] = s["total_score"]
+        r["breakdown"] = s["breakdown"]
+    return results, [dict(r, features=s["features"]) for r, s in zip(parsed, scores)]
+
+async def persist_scores(requisition_id: Optional[str], rows: List[dict]):
+    """Keeps raw feature vectors so /rescore can re-weight without re-parsing (one write, off the loop)."""
+    if requisition_id and rows:
+        await asyncio.to_thread(requisitions.save_scores, requisition_id, rows)
+
+async def score_parsed_results(results: List[dict], jd_data: dict, requisition_id: Optional[str] = None) -> List[dict]:
+    """Scores parsed results as one batch and persists their feature vectors."""
+    results, rows = await score_batch(results, jd_data)
+    await persist_scores(requisition_id, rows)
+    return results
+
+async def rerank_results(results: List[dict], jd_data: dict, requisition_id: str, top_k: Optional[int] = None, method: str = "mergesort") -> List[dict]:
+    """LLM reranking of the qualified results (seeded by score); rejected ones follow."""
+    jd_summary = summarize_jd(jd_data)
     qualified = sorted([r for r in results if r.get("status") == "QUALIFIED"], key=lambda x: x["rank_score"], reverse=True)
     
-    # 2. Apply LLM Merge Sort Reranking to Qualified Candidates
-    if len(qualified) > 1:
-        qualified = await rank_candidates_with_mergesort(qualified, jd_summary)
+    # 2. Apply LLM Reranking to Qualified Candidates
+    # top_k: order only the best K by tournament, the rest keep seed-score order
+    # method: "mergesort" (pairwise) or "listwise" (sliding windows, far fewer calls)
+    if top_k and 0 < top_k < len(qualified):
+        qualified = await rank_top_k_with_tournament(qualified, jd_summary, top_k, cache=comparisons, jd_key=comparison_key(jd_data))
+    else:
+        if method == "listwise":
+            if len(qualified) > 1:
+                qualified = await rank_candidates_listwise(qualified, jd_summary)
+        else:
+            if len(qualified) > 1:
+                qualified = await rank_candidates_with_mergesort(qualified, jd_summary, cache=comparisons, jd_key=comparison_key(jd_data))
+            # A full pairwise ranking becomes the requisition's base for incremental inserts
+            # (binary insertion assumes a consistent order; a listwise pass does not guarantee one)
+            requisitions.save_ranking(requisition_id, qualified)
         
     # 3. Assign Final Rank
     for idx, r in enumerate(qualified, 1):
@@ -103,23 +193,99 @@ async def rerank_candidates(job_description: str = Form(...), files: List[Upload
     rejected = [r for r in results if r.get("status") == "REJECTED"]
     return qualified + rejected
 
+def sort_results(results: List[dict]) -> List[dict]:
+    """Qualified by score (descending), then rejected; errors are left out."""
+    qualified = sorted([r for r in results if r.get("status") == "QUALIFIED"], key=lambda x: x["rank_score"], reverse=True)
+    rejected = [r for r in results if r.get("status") == "REJECTED"]
+    return qualified + rejected
+
+async def process_resume_files(files: List[UploadFile], jd_text: str, jd_data: dict, jd_summary: str, requisition_id: Optional[str] = None):
+    """Core pipeline: Ingest -> Parse (per file) -> Score (whole batch) -> Persist feature vectors"""
+    
+    async def process_task(file: UploadFile):
+        return await parse_resume_file(file.filename, await file.read(), jd_data)
+
+    tasks = [process_task(f) for f in files]
+    results = await asyncio.gather(*tasks)
+    return await score_parsed_results(results, jd_data, requisition_id)
+
+# Endpoint 1: Hybrid Score Only (Batch)
+@app.post("/score-candidates/")
+async def score_candidates(response: Response, job_description: Optional[str] = Form(None), files: List[UploadFile] = File(...), requisition_id: Optional[str] = Form(None)):
+    print(f"🚀 Endpoint 1: Scoring {len(files)} resumes...")
+    jd_data, requisition_id = await resolve_jd(job_description, requisition_id)
+    jd_summary = summarize_jd(jd_data)
+    response.headers["X-Requisition-ID"] = requisition_id
+    results = await process_resume_files(files, job_description, jd_data, jd_summary, requisition_id)
+    
+    # Simple semantic sort (descending)
+    return sort_results(results)
+
+# Endpoint 1b: Streaming variant of Endpoint 1 (NDJSON)
+@app.post("/score-candidates/stream")
+async def score_candidates_stream(job_description: Optional[str] = Form(None), files: List[UploadFile] = File(...), requisition_id: Optional[str] = Form(None)):
+    """
+    Emits one {"event": "result"} line per resume as soon as it is parsed and scored
+    (completion order), then one {"event": "summary"} line with the sorted list.
+    Resumes that finish parsing together are scored in one batched call, and feature
+    vectors are persisted once, before the summary.
+    """
+    print(f"🚀 Endpoint 1b: Streaming scores for {len(files)} resumes...")
+    jd_data, requisition_id = await resolve_jd(job_description, requisition_id)
+    # Read uploads now: they are closed once this handler returns the response
+    uploads = [(f.filename, await f.read()) for f in files]
+    
+    async def events():
+        tasks = [asyncio.create_task(parse_resume_file(name, content, jd_data)) for name, content in uploads]
+        pending = set(tasks)
+        results, rows = [], []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Everything parsed since the last wake-up (or during the previous batch) is scored together
+                batch, batch_rows = await score_batch([task.result() for task in done], jd_data)
+                rows += batch_rows
+                for result in batch:
+                    results.append(result)
+                    yield json.dumps({"event": "result", "data": result}) + "\n"
+            await persist_scores(requisition_id, rows)
+            yield json.dumps({"event": "summary", "requisition_id": requisition_id, "data": sort_results(results)}) + "\n"
+        finally:
+            # Client went away: stop the remaining parses
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson", headers={"X-Requisition-ID": requisition_id})
+
+# Endpoint 2: Rerank with SPPR (Top 8)
+@app.post("/rerank-candidates/")
+async def rerank_candidates(response: Response, job_description: Optional[str] = Form(None), files: List[UploadFile] = File(...), requisition_id: Optional[str] = Form(None), top_k: Optional[int] = Form(None), method: str = Form("mergesort")):
+    print(f"🚀 Endpoint 2: SPPR Reranking {len(files)} resumes...")
+    if method not in RERANK_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {list(RERANK_METHODS)}")
+    jd_data, requisition_id = await resolve_jd(job_description, requisition_id)
+    jd_summary = summarize_jd(jd_data)
+    response.headers["X-Requisition-ID"] = requisition_id
+    
+    # 1. Process & Score (Seed Sort)
+    results = await process_resume_files(files, job_description, jd_data, jd_summary, requisition_id)
+    return await rerank_results(results, jd_data, requisition_id, top_k, method)
+
 # Endpoint 3: Explanation (Input JSON)
 @app.post("/explain-candidate/")
 async def explain_candidate(
-    job_description: str = Body(...), 
-    candidate_data: Dict[str, Any] = Body(...)
+    candidate_data: Dict[str, Any] = Body(...),
+    job_description: Optional[str] = Body(None),
+    requisition_id: Optional[str] = Body(None)
 ):
     print(f"🚀 Endpoint 3: Explaining {candidate_data.get('filename')}...")
-    # Clean JD summary
-    jd_data = parse_jd(job_description)
-    
-    # Handle optional fields and nested structure safely
-    role_level = jd_data.get('role_level', 'Unknown Role')
-    min_exp = "0"
-    if jd_data.get('experience'):
-        min_exp = jd_data.get('experience', {}).get('min_years') or "0"
-        
-    jd_summary = f"{role_level} ({min_exp}y exp)"
+    # Clean JD summary (cached JD, no re-parse for known text or requisitions).
+    # A bare JD text is only parsed: explaining does not create a requisition.
+    if job_description and not requisition_id:
+        jd_data = await get_parsed_jd(job_description)
+    else:
+        jd_data, _ = await resolve_jd(job_description, requisition_id)
+    jd_summary = summarize_jd(jd_data)
     
     reasoning = await generate_explanation(candidate_data, jd_summary)
     return {
@@ -127,6 +293,143 @@ async def explain_candidate(
         "ai_explanation": reasoning
     }
 
+# Endpoint 3b: Register a JD once and refer to it by requisition_id afterwards
+@app.post("/requisitions/")
+async def create_requisition(job_description: str = Body(..., embed=True)):
+    jd_data, requisition_id = await resolve_jd(job_description, None)
+    return {"requisition_id": requisition_id, "jd_summary": summarize_jd(jd_data), "jd_data": jd_data}
+
+@app.get("/requisitions/{requisition_id}")
+async def get_requisition(requisition_id: str):
+    jd_data, _ = await resolve_jd(None, requisition_id)
+    return {"requisition_id": requisition_id, "jd_summary": summarize_jd(jd_data), "jd_data": jd_data}
+
+# Endpoint 3c: Add applicants to a requisition's stored ranking by binary insertion
+@app.post("/requisitions/{requisition_id}/candidates")
+async def add_candidates(requisition_id: str, files: List[UploadFile] = File(...)):
+    print(f"🚀 Endpoint 3c: Inserting {len(files)} resumes into requisition {requisition_id}...")
+    jd_data, _ = await resolve_jd(None, requisition_id)
+    jd_summary = summarize_jd(jd_data)
+    
+    results = await process_resume_files(files, None, jd_data, jd_summary, requisition_id)
+    new = sorted([r for r in results if r.get("status") == "QUALIFIED"], key=lambda x: x["rank_score"], reverse=True)
+    
+    # Re-uploads replace their previous entry; everyone else keeps their place and history
+    ranked = drop_reuploads(requisitions.get_ranking(requisition_id) or [], results)
+    ranked = await insert_candidates_into_ranking(ranked, new, jd_summary, cache=comparisons, jd_key=comparison_key(jd_data))
+    requisitions.save_ranking(requisition_id, ranked)
+    
+    for idx, r in enumerate(ranked, 1):
+        r['final_rank'] = idx
+        
+    rejected = [r for r in results if r.get("status") == "REJECTED"]
+    return ranked + rejected
+
+@app.get("/requisitions/{requisition_id}/ranking")
+async def get_ranking(requisition_id: str):
+    await resolve_jd(None, requisition_id)
+    ranked = requisitions.get_ranking(requisition_id) or []
+    for idx, r in enumerate(ranked, 1):
+        r['final_rank'] = idx
+    return ranked
+
+# Endpoint 3d: Background jobs for large batches (submit, then poll status / fetch result)
+async def run_job(job: dict, progress: JobProgress) -> List[dict]:
+    """Job runner: the score / rerank pipeline over the job's stored uploads."""
+    params = job["params"]
+    requisition_id = job["requisition_id"]
+    jd_data, _ = await resolve_jd(None, requisition_id)
+    
+    async def process_task(filename: str, path: str):
+        result = await parse_resume_file(filename, Path(path), jd_data, progress.advance)
+        if "error" in result:
+            progress.advance("failed")
+        return result
+    
+    results = await asyncio.gather(*(process_task(name, path) for name, path in job_store.files(job["job_id"])))
+    results = await score_parsed_results(results, jd_data, requisition_id)
+    progress.advance("scored", sum(1 for r in results if "rank_score" in r))
+    
+    if params["kind"] != "rerank":
+        return sort_results(results)
+    ranked = await rerank_results(results, jd_data, requisition_id, params.get("top_k"), params.get("method", "mergesort"))
+    progress.advance("reranked", sum(1 for r in ranked if "final_rank" in r))
+    return ranked
+
+job_store = JobStore()
+job_queue = JobQueue(job_store, run_job)
+JOB_KINDS = ("score", "rerank")
+
+@app.post("/jobs/")
+async def submit_job(
+    job_description: Optional[str] = Form(None),
+    files: List[UploadFile] = File(...),
+    requisition_id: Optional[str] = Form(None),
+    kind: str = Form("score"),
+    top_k: Optional[int] = Form(None),
+    method: str = Form("mergesort")
+):
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {list(JOB_KINDS)}")
+    if method not in RERANK_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {list(RERANK_METHODS)}")
+    jd_data, requisition_id = await resolve_jd(job_description, requisition_id)
+    
+    uploads = [(f.filename, await f.read()) for f in files]
+    job_id = await asyncio.to_thread(job_store.create, requisition_id, {"kind": kind, "top_k": top_k, "method": method}, uploads)
+    job_queue.submit(job_id)
+    print(f"🚀 Job {job_id}: queued {kind} of {len(uploads)} resumes")
+    return {"job_id": job_id, "requisition_id": requisition_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_store.get(job_id, with_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
+# Endpoint 4: Instant re-weighting of a stored requisition (no OCR / LLM / embedding)
+class RescoreRequest(BaseModel):
+    requisition_id: str
+    weights: Optional[Dict[str, float]] = None  # partial overrides of the default weights
+    min_degree: Optional[str] = None  # e.g. "Master's"; defaults to the JD requirement
+    min_experience_years: Optional[float] = None  # defaults to the JD requirement
+
+@app.post("/rescore")
+async def rescore(req: RescoreRequest):
+    unknown = set(req.weights or {}) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown weight keys: {sorted(unknown)}")
+    weights = {**DEFAULT_WEIGHTS, **(req.weights or {})}
+    results = requisitions.rescore(req.requisition_id, weights, req.min_degree, req.min_experience_years)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Unknown requisition_id")
+    return results
+
+# Endpoint 5: Embedding cache health (hit rate / size for tuning eviction limits)
+@app.get("/embedding-cache/stats")
+async def embedding_cache_stats():
+    return cache_stats()
+
+# Endpoint 6: Resume dedup cache health
+@app.get("/resume-cache/stats")
+async def resume_cache_stats():
+    return resume_cache.stats()
+
+# Endpoint 7: Pairwise comparison cache size
+@app.get("/comparison-cache/stats")
+async def comparison_cache_stats():
+    return comparisons.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8002)
\ No newline at end of file
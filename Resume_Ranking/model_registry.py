@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from embedding_cache import EmbeddingCache, get_embedding_cache
+
+# "torch": SentenceTransformer (PyTorch). "onnx": ONNX Runtime, fp32.
+# "onnx-int8": ONNX Runtime with the dynamically int8-quantized model (fastest on CPU).
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# One loaded instance per (model name, backend) per process, created on first use
+_models: Dict[Tuple[str, str], object] = {}
+_lock = threading.Lock()
+
+def _load(model_name: str, backend: str):
+    # Imported here too: torch / sentence-transformers cost seconds to import
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    from onnx_embedder import OnnxEmbedder
+    return OnnxEmbedder(model_name, quantized=backend == "onnx-int8")
+
+def get_model(model_name: str, backend: Optional[str] = None):
+    """
+    Returns the process-wide encoder for model_name on the given backend (default
+    EMBEDDING_BACKEND), loading it on first call. Every backend exposes encode(texts, batch_size).
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    key = (model_name, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        if key not in _models:
+            start = time.perf_counter()
+            _models[key] = _load(model_name, backend)
+            print(f"   ⏱️ Loaded embedding model {model_name} ({backend}) in {time.perf_counter() - start:.1f}s")
+        return _models[key]
+
+def embedding_name(model_name: str, backend: Optional[str] = None) -> str:
+    """
+    Cache namespace of a model's vectors. Backends differ slightly (int8 most), so each
+    gets its own entries; torch keeps the bare model name and its existing cache.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+def get_embedder(model_name: str, backend: Optional[str] = None) -> EmbeddingCache:
+    """
+    Cached encoder for model_name. The model itself is only loaded when a text
+    misses the cache, so fully cached work never pays the model start-up.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    return get_embedding_cache(None, embedding_name(model_name, backend),
+                               loader=lambda: get_model(model_name, backend))
+
+def warmup(model_names: Iterable[str]):
+    """Loads models ahead of traffic (e.g. in a startup hook) and runs one tiny forward pass."""
+    for name in model_names:
+        get_model(name).encode(["warmup"])
@@ -0,0 +1,159 @@
+import json
+import os
+import platform
+from typing import List, Optional
+
+import numpy as np
+
+# Pre-exported files published with the sentence-transformers models on the Hugging Face Hub
+ONNX_FILE = "onnx/model.onnx"
+# Dynamic int8 builds, one per CPU instruction set
+QUANTIZED_FILES = {
+    "arm64": "onnx/model_qint8_arm64.onnx",
+    "avx2": "onnx/model_quint8_avx2.onnx",
+    "avx512": "onnx/model_qint8_avx512.onnx",
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+}
+# "auto" picks the build for this CPU (see detect_quantization); a host with no
+# matching build, or whose build fails to load, falls back to the fp32 model
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "auto")
+# Intra-op threads per session; 0 lets ONNX Runtime use every core
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", 0))
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+def cpu_flags() -> set:
+    """Instruction-set flags of the first CPU (Linux only; empty elsewhere)."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+def detect_quantization() -> Optional[str]:
+    """Best int8 build for this machine, or None when none of QUANTIZED_FILES fits."""
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return "arm64"
+    if machine not in ("x86_64", "amd64"):
+        return None
+    flags = cpu_flags()
+    if not flags:
+        return "avx2"  # flags unknown (not Linux): every x86-64 server CPU of the last decade has AVX2
+    if {"avx512f", "avx512_vnni"} <= flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    if "avx2" in flags:
+        return "avx2"
+    return None
+
+def hub_repo(model_name: str) -> str:
+    """Short names ("all-MiniLM-L6-v2") live under the sentence-transformers organisation."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+class OnnxEmbedder:
+    """
+    Sentence embedder on ONNX Runtime (CPU), a stand-in for SentenceTransformer.encode
+    without torch. Tokenization, pooling and normalization follow the model's
+    sentence-transformers config, so vectors match the torch model up to numerical
+    noise (fp32) or quantization error (int8).
+    """
+
+    def __init__(self, model_name: str, quantized: bool = False, quantization: str = ONNX_QUANTIZATION,
+                 threads: Optional[int] = None):
+        # Imported here: only deployments that pick this backend need onnxruntime
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        if quantized and quantization == "auto":
+            quantization = detect_quantization()
+            if quantization is None:
+                print(f"   ⚠️ No int8 ONNX build for {platform.machine()}, using fp32")
+                quantized = False
+        elif quantized and quantization not in QUANTIZED_FILES:
+            raise ValueError(f"Unknown ONNX quantization: {quantization}")
+        repo = hub_repo(model_name)
+        self.model_name = model_name
+        self.onnx_file = QUANTIZED_FILES[quantization] if quantized else ONNX_FILE
+
+        def config(filename: str, default):
+            try:
+                with open(hf_hub_download(repo, filename), "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return default
+
+        modules = config("modules.json", [])
+        pooling = config("1_Pooling/config.json", {})
+        self.max_seq_length = config("sentence_bert_config.json", {}).get("max_seq_length", DEFAULT_MAX_SEQ_LENGTH)
+        self.pool_cls = bool(pooling.get("pooling_mode_cls_token"))
+        self.normalize = any(m.get("type", "").endswith("Normalize") for m in modules)
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(repo, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        if self.tokenizer.padding is None:
+            self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = ONNX_THREADS if threads is None else threads
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        try:
+            self.session = ort.InferenceSession(hf_hub_download(repo, self.onnx_file), options,
+                                                providers=["CPUExecutionProvider"])
+        except Exception as e:
+            if self.onnx_file == ONNX_FILE:
+                raise
+            print(f"   ⚠️ Could not load {self.onnx_file} ({e}), using fp32")
+            self.onnx_file = ONNX_FILE
+            self.session = ort.InferenceSession(hf_hub_download(repo, ONNX_FILE), options,
+                                                providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in inputs.items() if k in self.input_names})[0]
+        if self.pool_cls:
+            return hidden[:, 0]
+        weights = mask[:, :, None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts, batch_size: int = 32, **_) -> np.ndarray:
+        """Same contract as SentenceTransformer.encode: a str gives a vector, a list a matrix."""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Length-sorted batches, as sentence-transformers does, so little compute goes to padding
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            embs = self._embed_batch([texts[i] for i in rows])
+            if out is None:
+                out = np.empty((len(texts), embs.shape[1]), dtype=np.float32)
+            out[rows] = embs
+        if self.normalize:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+    def similarity(self, a, b) -> np.ndarray:
+        """Cosine similarity matrix, like SentenceTransformer.similarity for cosine models."""
+        a = np.atleast_2d(np.asarray(a, dtype=np.float32))
+        b = np.atleast_2d(np.asarray(b, dtype=np.float32))
+        a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+        b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+        return a @ b.T
@@ -1,15 +1,69 @@
 
+import asyncio
 import json
 import copy
+import os
+from typing import Optional
 from utils import calculate_rule_based_score, calculate_semantic_score, compute_hybrid_fit_score
-from llm_ranking import compare_candidates_pairwise, generate_explanation
+from llm_ranking import LLMPairwiseSorter, comparison_key, generate_explanation
+from comparison_cache import ComparisonCache
 
-def run_pipeline(candidates: list, job_data: dict, top_k: int = 5) -> dict:
+RESUME_KEYS = ["summary", "skills", "experience", "education", "projects", "certifications", "portfolio_url"]
+
+# Max explanation LLM calls in flight during phase 4
+EXPLAIN_CONCURRENCY = int(os.getenv("EXPLAIN_CONCURRENCY", 8))
+
+def explain_rule_rejection(cand: dict, job_data: dict):
+    """
+    Deterministic explanation for a rule-based rejection, built from rule_results.
+    Returns None when no failed rule is recorded (the caller falls back to the LLM).
+    """
+    scores = cand.get('rule_results', {}).get('scores', {})
+    reasons = []
+    if scores.get('degree_check') == 0.0:
+        jd_edu = job_data.get('education', {})
+        req_degree = jd_edu.get('degree', '') if isinstance(jd_edu, dict) else ''
+        reasons.append(f"does not hold the required degree ({req_degree or 'as specified'})")
+    if scores.get('experience_check') == 0.0:
+        years = scores.get('total_experience_years') or 0
+        reasons.append(f"has {years:.1f} years of experience, below the required {job_data.get('min_experience_years', 0)}")
+    if not reasons:
+        return None
+    return f"Rejected by the screening rules: the candidate {' and '.join(reasons)}."
+
+async def explain_candidates(shortlist: list, rejected: list, job_data: dict, max_concurrency: int = EXPLAIN_CONCURRENCY):
+    """
+    Phase 4: LLM explanations for the shortlist (and any rejection without a failed rule),
+    generated concurrently under a bounded limit; template explanations for rule rejections.
+    """
+    job_title = job_data.get('title', 'Role')
+    limiter = asyncio.Semaphore(max_concurrency)
+    
+    async def explain(cand, rank_str):
+        async with limiter:
+            try:
+                cand['llm_explanation'] = await generate_explanation(cand, job_title, rank_str)
+            except Exception as e:
+                print(f"Explanation Error for {cand.get('id')}: {e}")
+                cand['llm_explanation'] = "Explanation unavailable."
+    
+    tasks = [explain(cand, f"RANKED #{i+1}") for i, cand in enumerate(shortlist)]
+    for cand in rejected:
+        template = explain_rule_rejection(cand, job_data)
+        if template is None:
+            tasks.append(explain(cand, "REJECTED"))
+        else:
+            cand['llm_explanation'] = template
+    
+    print(f"Generating Explanations: {len(tasks)} via LLM, {len(rejected) + len(shortlist) - len(tasks)} from templates...")
+    await asyncio.gather(*tasks)
+
+async def run_pipeline(candidates: list, job_data: dict, top_k: int = 5, cache: Optional[ComparisonCache] = None) -> dict:
     """
     Full Hybrid Ranking Pipeline:
     1. Hard Filter (Rule Based)
     2. Soft Score (Semantic) -> Top K
-    3. LLM Pairwise Rerank -> Final List
+    3. LLM Pairwise Rerank (merge sort + comparison cache) -> Final List
     4. XAI Generation
     """
     
@@ -66,42 +120,35 @@ def run_pipeline(candidates: list, job_data: dict, top_k: int = 5) -> dict:
     others = qualified_candidates[top_k:] # Kept but not reranked
     
     # ----------------------------------------------------
-    # PHASE 3: LLM PAIRWISE RERANKING (BUBBLE SORT / TOURNAMENT)
+    # PHASE 3: LLM PAIRWISE RERANKING (PARALLEL MERGE SORT)
     # ----------------------------------------------------
-    # For small K (e.g. 5), a simple bubble sort or insertion sort using LLM comparator is feasible.
-    # Let's do a simple Bubble Sort for the Shortlist to refine order.
-    # Note: Bubble sort is O(K^2), so K should be small (<= 5 or 10).
+    # ~K log K comparisons, independent merges run concurrently, and verdicts
+    # already in the comparison cache (or implied by it) cost no LLM call,
+    # so a top_k of 20-30 is affordable.
+    rerank_stats = {"comparisons": 0, "cache_hits": 0, "inferred": 0, "prompt_tokens": 0}
     
     if len(shortlist) > 1:
         print(f"Running LLM Pairwise Reranking on Top {len(shortlist)}...")
         job_summary = job_data.get('description', 'Job Role')[:500]
         
-        n = len(shortlist)
-        for i in range(n):
-            for j in range(0, n-i-1):
-                cand_a = shortlist[j]
-                cand_b = shortlist[j+1]
-                
-                # Compare A and B
-                print(f"Comparing {cand_a.get('id')} vs {cand_b.get('id')}...")
-                result = compare_candidates_pairwise(cand_a, cand_b, job_summary)
-                
-                winner_id = result.get('winner_id')
-                
-                # If B wins, swap. (We want descending order, so array[0] is best)
-                # Currently array is [Best ... Worst]
-                # If B is better than A, then B should be at j, A at j+1? 
-                # Wait, if we want [Best, 2nd Best...], we usually sort descending.
-                # Bubble sort (ascending): pushes largest to end.
-                # Here we want Best at index 0.
-                # Let's think:
-                # If pairwise says "Winner is B", then B > A.
-                # If we are at index j (A) and j+1 (B).
-                # If B > A, we should swap them so B comes earlier?
-                # Yes, for descending order, if B > A, swap.
-                
-                if winner_id == cand_b.get('id'):
-                    shortlist[j], shortlist[j+1] = shortlist[j+1], shortlist[j]
+        # The sorter reads 'filename' / 'extracted_data'; pipeline candidates carry 'id' / 'sections'
+        entries = [{"filename": c.get('id', 'unknown'), "extracted_data": c.get('sections') or {k: c.get(k) for k in RESUME_KEYS}, "candidate": c} for c in shortlist]
+        sorter = LLMPairwiseSorter(job_summary, cache=cache if cache is not None else ComparisonCache(), jd_key=comparison_key(job_data))
+        sorter.preload(entries)
+        entries = await sorter.merge_sort(entries)
+        
+        shortlist = []
+        for entry in entries:
+            entry["candidate"]["match_history"] = entry.get("match_history", [])
+            shortlist.append(entry["candidate"])
+        
+        rerank_stats = {
+            "comparisons": sorter.comparison_count,
+            "cache_hits": sorter.cache_hits,
+            "inferred": sorter.inferred_count,
+            "prompt_tokens": sorter.prompt_tokens
+        }
+        print(f"LLM Comparisons: {sorter.comparison_count} (cache hits: {sorter.cache_hits}, inferred: {sorter.inferred_count})")
     
     # Combine back
     final_ranked_list = shortlist + others
@@ -109,19 +156,7 @@ def run_pipeline(candidates: list, job_data: dict, top_k: int = 5) -> dict:
     # ----------------------------------------------------
     # PHASE 4: EXPLAINABLE AI
     # ----------------------------------------------------
-    print("Generating Explanations...")
-    job_title = job_data.get('title', 'Role')
-    
-    # Generate for Shortlist (Detailed)
-    for i, cand in enumerate(shortlist):
-        rank_str = f"RANKED #{i+1}"
-        explanation = generate_explanation(cand, job_title, rank_str)
-        cand['llm_explanation'] = explanation
-        
-    # Generate for Rejected (Why failed?)
-    for cand in rejected_candidates:
-        explanation = generate_explanation(cand, job_title, "REJECTED")
-        cand['llm_explanation'] = explanation
+    await explain_candidates(shortlist, rejected_candidates, job_data)
         
     # Others might get a generic "Qualified but low score" explanation or skip to save tokens
     for cand in others:
@@ -129,7 +164,8 @@ def run_pipeline(candidates: list, job_data: dict, top_k: int = 5) -> dict:
 
     return {
         "ranked": final_ranked_list,
-        "rejected": rejected_candidates
+        "rejected": rejected_candidates,
+        "rerank_stats": rerank_stats
     }
 
 # Demo Run
@@ -160,7 +196,7 @@ if __name__ == "__main__":
     
     candidates = [c1, c2, c3]
     
-    results = run_pipeline(candidates, jd, top_k=2)
+    results = asyncio.run(run_pipeline(candidates, jd, top_k=2))
     
     print("\n\n============= FINAL RESULTS =============")
     print("--- RANKED ---")
@@ -168,6 +204,7 @@ if __name__ == "__main__":
         print(f"{r['id']} | Score: {r.get('final_numeric_score', 0):.1f}")
         print(f"Explanation: {r.get('llm_explanation')}\n")
         
+    print(f"LLM comparisons: {results['rerank_stats']}\n")
     print("--- REJECTED ---")
     for r in results['rejected']:
         print(f"{r['id']} | Reason: Rule Failure")
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from scoring import (FEATURE_WEIGHTS, candidate_degree_rank, required_degree_rank,
+                     rescore_features)
+from storage import DB_PATH, connect, json_hash
+
+def drop_reuploads(ranked: List[Dict], results: List[Dict]) -> List[Dict]:
+    """Stored ranking minus the documents uploaded again (same content hash; filenames may repeat)."""
+    uploaded = {r["file_hash"] for r in results if "file_hash" in r}
+    return [r for r in ranked if r.get("file_hash") not in uploaded]
+
+class RequisitionStore:
+    """
+    Persists, per requisition, the parsed JD and each candidate's raw feature
+    vector (FEATURE_WEIGHTS order, keyed by resume content hash) so a pool can be rescored with new weights or
+    thresholds without re-running OCR, parsing or embedding.
+    Also caches parsed JDs by normalized text hash, so a JD is sent to the LLM once,
+    and keeps the latest LLM ranking per requisition so new applicants can be inserted
+    into it instead of re-sorting the pool.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.conn = connect(db_path)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS requisitions ("
+                "requisition_id TEXT PRIMARY KEY, jd_json TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_jds ("
+                "jd_hash TEXT PRIMARY KEY, jd_json TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Candidates are identified by resume content hash; filename is display only.
+            # Tables from before that (keyed by filename) cannot be told apart, so they are rebuilt.
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(candidate_features)")]
+            if columns and "file_hash" not in columns:
+                self.conn.execute("DROP TABLE candidate_features")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS candidate_features ("
+                "requisition_id TEXT NOT NULL, file_hash TEXT NOT NULL, filename TEXT NOT NULL, features TEXT NOT NULL, "
+                "degree_rank INTEGER NOT NULL, experience_years REAL NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (requisition_id, file_hash))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS rankings ("
+                "requisition_id TEXT PRIMARY KEY, ranking_json TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def get_parsed_jd(self, jd_hash: str) -> Optional[Dict]:
+        """Parsed JD for a normalized JD text hash (see storage.text_hash), if seen before."""
+        with self.lock:
+            row = self.conn.execute("SELECT jd_json FROM parsed_jds WHERE jd_hash = ?", (jd_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_parsed_jd(self, jd_hash: str, jd_data: Dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parsed_jds VALUES (?, ?, ?)", (jd_hash, json.dumps(jd_data), time.time())
+            )
+
+    def register(self, jd_data: Dict, requisition_id: Optional[str] = None) -> Optional[str]:
+        """
+        Creates a requisition for a parsed JD and returns its ID. An existing ID keeps its JD:
+        registering it again with a different one returns None, since its stored features,
+        ranking and comparisons all belong to the original JD.
+        """
+        requisition_id = requisition_id or self.new_id()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO requisitions (requisition_id, jd_json, created_at) VALUES (?, ?, ?)",
+                (requisition_id, json.dumps(jd_data), time.time()),
+            )
+            stored = self.conn.execute(
+                "SELECT jd_json FROM requisitions WHERE requisition_id = ?", (requisition_id,)
+            ).fetchone()[0]
+        if json_hash(json.loads(stored)) != json_hash(jd_data):
+            return None
+        return requisition_id
+
+    def get_jd(self, requisition_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT jd_json FROM requisitions WHERE requisition_id = ?", (requisition_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_scores(self, requisition_id: str, results: List[Dict]):
+        """Stores feature vectors of scored results (entries with 'features'); the same document overwrites."""
+        now = time.time()
+        rows = [
+            (requisition_id, r["file_hash"], r["filename"], json.dumps(r["features"]),
+             candidate_degree_rank(r["extracted_data"]),
+             float(r["breakdown"]["rules"].get("total_experience_years", 0.0)), now)
+            for r in results if "features" in r
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candidate_features VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get_ranking(self, requisition_id: str) -> Optional[List[Dict]]:
+        """Ordered candidates (best first, with match_history) from the last LLM ranking."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT ranking_json FROM rankings WHERE requisition_id = ?", (requisition_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_ranking(self, requisition_id: str, ranking: List[Dict]):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rankings VALUES (?, ?, ?)", (requisition_id, json.dumps(ranking), time.time())
+            )
+
+    def rescore(self, requisition_id: str, weights: Optional[Dict] = None,
+                min_degree: Optional[str] = None, min_experience_years: Optional[float] = None) -> Optional[List[Dict]]:
+        """
+        Applies weights and hard-constraint thresholds to the stored vectors.
+        Thresholds default to the requisition's JD. Returns None for unknown requisitions.
+        """
+        jd_data = self.get_jd(requisition_id)
+        if jd_data is None:
+            return None
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT file_hash, filename, features, degree_rank, experience_years FROM candidate_features "
+                "WHERE requisition_id = ?", (requisition_id,)
+            ).fetchall()
+        if not rows:
+            return []
+
+        if min_degree is None:
+            req_rank = required_degree_rank(jd_data)
+        else:
+            req_rank = required_degree_rank({"education": {"degree": min_degree}})
+        if min_experience_years is None:
+            min_experience_years = jd_data.get("min_experience_years", 0) or 0
+
+        features = np.array([json.loads(r[2]) for r in rows])
+        totals, degree_ok, experience_ok, features = rescore_features(
+            features, [r[3] for r in rows], [r[4] for r in rows], req_rank, min_experience_years, weights
+        )
+
+        results = []
+        for (fhash, filename, _, _, years), total, deg, exp, row in zip(rows, totals, degree_ok, experience_ok, features):
+            rules = {"degree_check": float(row[0]), "total_experience_years": years, "experience_check": float(row[1])}
+            semantic = {key: float(row[i]) for i, (group, key, _) in enumerate(FEATURE_WEIGHTS) if group == "semantic"}
+            if not deg:
+                reason = "Failed Degree Requirement"
+            elif not exp:
+                reason = "Failed Minimum Experience Requirement"
+            else:
+                reason = "Qualified"
+            results.append({
+                "filename": filename,
+                "file_hash": fhash,
+                "status": "QUALIFIED" if deg and exp else "REJECTED",
+                "logic_reason": reason,
+                "rank_score": round(float(total), 2),
+                "breakdown": {"rules": rules, "semantic": semantic},
+            })
+
+        # Same ordering as /score-candidates/: qualified by score, then rejected
+        qualified = sorted([r for r in results if r["status"] == "QUALIFIED"], key=lambda x: x["rank_score"], reverse=True)
+        rejected = [r for r in results if r["status"] == "REJECTED"]
+        return qualified + rejected
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+from storage import DB_PATH, connect, text_hash
+
+def file_hash(data: bytes) -> str:
+    """Content address of an uploaded document."""
+    return hashlib.sha256(data).hexdigest()
+
+class ResumeCache:
+    """
+    Dedup cache for repeat uploads, keyed by document hash.
+    Ingestion output (text, links, OCR info) depends only on the file;
+    parsed resume JSON is additionally keyed by the parsing context and by
+    parse_version (see ats_parsers.resume_parse_version), so a prompt, schema or
+    model change stops serving earlier parses. The API parses JD-agnostically, so
+    its context is always the canonical "".
+    """
+
+    def __init__(self, db_path=DB_PATH, parse_version: str = ""):
+        self.conn = connect(db_path)
+        self.parse_version = parse_version
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingestions ("
+                "file_hash TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_resumes ("
+                "file_hash TEXT NOT NULL, context_key TEXT NOT NULL, payload TEXT NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (file_hash, context_key))"
+            )
+
+    def context_key(self, context: str) -> str:
+        return text_hash(context or "", namespace=self.parse_version)
+
+    def _get(self, sql: str, params) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute(sql, params).fetchone()
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def get_ingestion(self, fhash: str) -> Optional[Dict]:
+        return self._get("SELECT payload FROM ingestions WHERE file_hash = ?", (fhash,))
+
+    def put_ingestion(self, fhash: str, ingested: Dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ingestions VALUES (?, ?, ?)", (fhash, json.dumps(ingested), time.time())
+            )
+
+    def get_parsed(self, fhash: str, context: str) -> Optional[Dict]:
+        return self._get(
+            "SELECT payload FROM parsed_resumes WHERE file_hash = ? AND context_key = ?",
+            (fhash, self.context_key(context)),
+        )
+
+    def put_parsed(self, fhash: str, context: str, resume_data: Dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parsed_resumes VALUES (?, ?, ?, ?)",
+                (fhash, self.context_key(context), json.dumps(resume_data), time.time()),
+            )
+
+    def stats(self) -> Dict:
+        with self.lock:
+            ingestions = self.conn.execute("SELECT COUNT(*) FROM ingestions").fetchone()[0]
+            parsed = self.conn.execute("SELECT COUNT(*) FROM parsed_resumes").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ingestions": ingestions,
+            "parsed_resumes": parsed,
+        }
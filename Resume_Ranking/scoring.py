@@ -1,11 +1,49 @@
 
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from typing import Dict
+import io
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from model_registry import embedding_name, get_embedder
+from storage import CACHE_DIR, text_hash
 
-# Load model once
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Model is loaded lazily, once per process, by the registry (shared with utils.py)
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Model plus backend (EMBEDDING_BACKEND): vectors from different backends are never mixed
+EMBEDDING_NAME = embedding_name(MODEL_NAME)
+# Cached front for model.encode
+embedder = get_embedder(MODEL_NAME)
+
+# Texts per forward pass when encoding a whole request at once
+EMBED_BATCH_SIZE = 256
+# Serialized JDProfiles, one .npz per distinct parsed JD
+JD_PROFILE_DIR = CACHE_DIR / "jd_profiles"
+# Candidates per vectorized kernel pass (bounds the padded tensor size)
+KERNEL_CHUNK_SIZE = 256
+
+DEFAULT_WEIGHTS = {
+    # Rule based (bonuses)
+    'degree_score': 0.1, # Don't use degree score * degree check
+    'experience_score': 0.2, # Don't use experience score * experience check
+    
+    # Semantic
+    'education_course': 0.15,
+    'certifications': 0.1,
+    'skills': 0.3,
+    'description_focus': 0.15
+}
+
+# Column order of the feature matrix and the weight each column is multiplied by
+FEATURE_WEIGHTS = [
+    ('rules', 'degree_check', 'degree_score'),
+    ('rules', 'experience_check', 'experience_score'),
+    ('semantic', 'education_course_similarity', 'education_course'),
+    ('semantic', 'certification_similarity', 'certifications'),
+    ('semantic', 'skill_similarity', 'skills'),
+    ('semantic', 'description_focus_similarity', 'description_focus'),
+]
 
 def parse_degree_rank(degree_str):
     """
@@ -31,6 +69,21 @@ def parse_degree_rank(degree_str):
         
     return 0
 
+def required_degree_rank(job_data) -> int:
+    """Rank of the JD education requirement (0 = no requirement)."""
+    jd_edu = job_data.get('education', {})
+    req_degree = jd_edu.get('degree', '') if isinstance(jd_edu, dict) else ''
+    return parse_degree_rank(req_degree)
+
+def candidate_degree_rank(candidate_data) -> int:
+    """Highest degree rank found in the resume education list."""
+    cand_max_rank = 0
+    for edu in candidate_data.get('education', []):
+        rank = parse_degree_rank(edu.get('degree', ''))
+        if rank > cand_max_rank:
+            cand_max_rank = rank
+    return cand_max_rank
+
 def calculate_rule_based_score(candidate_data, job_data):
     """
     Calculates hard rule scores. Returns invalid (0) if checks fail.
@@ -39,18 +92,8 @@ def calculate_rule_based_score(candidate_data, job_data):
     is_qualified = True
     
     # 1. Degree Check (Hard Rule)
-    # JD education requirement
-    jd_edu = job_data.get('education', {})
-    req_degree = jd_edu.get('degree', '') if isinstance(jd_edu, dict) else ''
-    req_rank = parse_degree_rank(req_degree)
-    
-    # Resume education (find max rank)
-    cand_edu_list = candidate_data.get('education', [])
-    cand_max_rank = 0
-    for edu in cand_edu_list:
-        rank = parse_degree_rank(edu.get('degree', ''))
-        if rank > cand_max_rank:
-            cand_max_rank = rank
+    req_rank = required_degree_rank(job_data)
+    cand_max_rank = candidate_degree_rank(candidate_data)
             
     # Degree Logic:
     # If req > cand: 0 (Disqualify)
@@ -95,7 +138,38 @@ def calculate_rule_based_score(candidate_data, job_data):
         'scores': scores
     }
 
-def get_best_match_score(query_list, target_list):
+def encode_texts(texts, embeddings=None):
+    """
+    Encodes a list of strings. When a precomputed embedding table
+    (see build_embedding_table) is given, rows are looked up instead.
+    """
+    if embeddings is not None:
+        return np.stack([embeddings[t] for t in texts])
+    return embedder.encode(texts)
+
+def _string_items(items) -> List[str]:
+    return [t for t in items if isinstance(t, str)] if isinstance(items, list) else []
+
+def collect_resume_texts(candidate_data) -> List[str]:
+    """Gathers every resume string the semantic scorer encodes."""
+    texts = _string_items(candidate_data.get('skills', [])) + _string_items(candidate_data.get('certifications', []))
+    texts.extend(_string_items([e.get('course', '') for e in candidate_data.get('education', []) if e.get('course')]))
+    for section in ('experience', 'projects'):
+        texts.extend(_string_items([item['description'] for item in candidate_data.get(section, []) if 'description' in item]))
+    return texts
+
+def build_embedding_table(texts) -> Dict[str, np.ndarray]:
+    """
+    Deduplicates texts and encodes them in large batches.
+    Returns a {text: embedding} lookup shared by every candidate in a request.
+    """
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return {}
+    embs = embedder.encode(unique, batch_size=EMBED_BATCH_SIZE)
+    return dict(zip(unique, embs))
+
+def get_best_match_score(query_list, target_list, embeddings=None):
     """
     For each item in query_list, find best match in target_list.
     Return average of these best matches (coverage).
@@ -107,8 +181,8 @@ def get_best_match_score(query_list, target_list):
     if not target_list:
         return 0.0
         
-    query_embs = model.encode(query_list)
-    target_embs = model.encode(target_list)
+    query_embs = encode_texts(query_list, embeddings)
+    target_embs = encode_texts(target_list, embeddings)
     
     # shape: (n_query, n_target)
     sim_matrix = cosine_similarity(query_embs, target_embs)
@@ -118,64 +192,171 @@ def get_best_match_score(query_list, target_list):
     
     return float(max_sims.mean())
 
-def calculate_semantic_score(candidate_data, job_data):
+def normalize_rows(embs: np.ndarray) -> np.ndarray:
+    """L2-normalizes embedding rows so cosine similarity becomes a dot product."""
+    embs = np.asarray(embs, dtype=np.float32)
+    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+    return embs / np.maximum(norms, 1e-12)
+
+@dataclass
+class JDProfile:
+    """
+    A parsed JD together with its normalized embeddings.
+    Built once per job description and reused for every candidate scored against it.
+    List fields are None when the JD value has an unusable type (scores 0.0, as before).
+    """
+    jd: Dict
+    skills: Optional[List[str]]
+    skill_embs: np.ndarray
+    certifications: Optional[List[str]]
+    cert_embs: np.ndarray
+    course_required: bool
+    courses: List[str]
+    course_embs: np.ndarray
+    description: str
+    description_emb: np.ndarray
+    model_name: str = EMBEDDING_NAME
+
+    @classmethod
+    def build(cls, job_data: Dict, embeddings=None) -> "JDProfile":
+        skills = job_data.get('skills', [])
+        certs = job_data.get('certifications', [])
+        course = job_data.get('education', {}).get('course', '')
+        if isinstance(course, str):
+            courses = [course]
+        elif isinstance(course, list):
+            courses = course
+        else:
+            courses = []
+        description = job_data.get('description', '') or ''
+
+        skills = skills if isinstance(skills, list) else None
+        certs = certs if isinstance(certs, list) else None
+        texts = (skills or []) + (certs or []) + courses + ([description] if description else [])
+        if embeddings is None:
+            embeddings = build_embedding_table(texts)
+
+        def embed(items):
+            if not items:
+                return np.zeros((0, 0), dtype=np.float32)
+            return normalize_rows(encode_texts(items, embeddings))
+
+        return cls(
+            jd=job_data,
+            skills=skills, skill_embs=embed(skills),
+            certifications=certs, cert_embs=embed(certs),
+            course_required=bool(course), courses=courses, course_embs=embed(courses),
+            description=description, description_emb=embed([description] if description else []),
+        )
+
+    def to_bytes(self) -> bytes:
+        meta = {
+            'jd': self.jd, 'skills': self.skills, 'certifications': self.certifications,
+            'course_required': self.course_required, 'courses': self.courses,
+            'description': self.description, 'model_name': self.model_name,
+        }
+        buf = io.BytesIO()
+        np.savez(buf, meta=np.array(json.dumps(meta)), skill_embs=self.skill_embs, cert_embs=self.cert_embs,
+                 course_embs=self.course_embs, description_emb=self.description_emb)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "JDProfile":
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+        meta = json.loads(str(arrays['meta']))
+        if meta['model_name'] != EMBEDDING_NAME:
+            raise ValueError(f"JD profile was built with {meta['model_name']}, not {EMBEDDING_NAME}")
+        return cls(skill_embs=arrays['skill_embs'], cert_embs=arrays['cert_embs'],
+                   course_embs=arrays['course_embs'], description_emb=arrays['description_emb'], **meta)
+
+    def save(self, path: str):
+        # Write-then-rename: concurrent scoring processes never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "JDProfile":
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+def as_jd_profile(job_data, embeddings=None) -> JDProfile:
+    """Accepts either a parsed JD dict or an existing JDProfile."""
+    if isinstance(job_data, JDProfile):
+        return job_data
+    return JDProfile.build(job_data, embeddings)
+
+def load_or_build_jd_profile(job_data: Dict) -> JDProfile:
+    """
+    Returns the JDProfile for a parsed JD, reading it from the on-disk cache when
+    the same JD was profiled before (keyed by JD content, model name and backend).
+    """
+    key = text_hash(json.dumps(job_data, sort_keys=True), EMBEDDING_NAME)
+    path = JD_PROFILE_DIR / f"{key}.npz"
+    if path.exists():
+        try:
+            return JDProfile.load(str(path))
+        except Exception as e:
+            print(f"   ⚠️ Rebuilding JD profile: {e}")
+    profile = JDProfile.build(job_data)
+    JD_PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profile.save(str(path))
+    return profile
+
+def _coverage(jd_items, jd_embs, cand_items, embeddings) -> float:
+    """Mean over JD items of the best cosine match among candidate items (see get_best_match_score)."""
+    if not jd_items:
+        return 1.0
+    if not cand_items:
+        return 0.0
+    sim_matrix = jd_embs @ normalize_rows(encode_texts(cand_items, embeddings)).T
+    return float(sim_matrix.max(axis=1).mean())
+
+def calculate_semantic_score(candidate_data, job_data, embeddings=None):
     """
     Computes semantic similarity for Education, Certs, Skills, Description.
+    job_data may be a parsed JD or a prebuilt JDProfile; with a profile only the
+    candidate's own strings are encoded. Pass an embedding table from
+    build_embedding_table to skip per-call encoding entirely.
     """
+    profile = as_jd_profile(job_data, embeddings)
     scores = {}
     
     # 1. Education (Course)
-    jd_course = job_data.get('education', {}).get('course', '')
     cand_courses = [e.get('course', '') for e in candidate_data.get('education', []) if e.get('course')]
     
-    if jd_course and cand_courses:
-        # Normalize jd_course to list
-        if isinstance(jd_course, str):
-            jd_courses_list = [jd_course]
-        elif isinstance(jd_course, list):
-            jd_courses_list = jd_course
-        else:
-            jd_courses_list = []
-
-        if jd_courses_list:
-            # Compare all JD courses vs all candidate courses
-            jd_embs = model.encode(jd_courses_list)
-            cand_embs = model.encode(cand_courses)
-            
-            # Matrix shape: (n_jd_options, n_cand_courses)
-            cos_sim_matrix = cosine_similarity(jd_embs, cand_embs)
-            
-            # We want the single best match found (max of maxes)
-            scores['education_course_similarity'] = float(cos_sim_matrix.max())
-        else:
-            scores['education_course_similarity'] = 0.0
+    if not profile.course_required:
+        scores['education_course_similarity'] = 1.0
+    elif profile.courses and cand_courses:
+        # Compare all JD courses vs all candidate courses
+        # Matrix shape: (n_jd_options, n_cand_courses)
+        cos_sim_matrix = profile.course_embs @ normalize_rows(encode_texts(cand_courses, embeddings)).T
+        
+        # We want the single best match found (max of maxes)
+        scores['education_course_similarity'] = float(cos_sim_matrix.max())
     else:
-        scores['education_course_similarity'] = 0.0 if jd_course else 1.0
+        scores['education_course_similarity'] = 0.0
 
     # 2. Certification
-    jd_certs = job_data.get('certifications', [])
     cand_certs = candidate_data.get('certifications', [])
     
     # Calculate coverage of JD certs in Candidate certs
-    if isinstance(jd_certs, list) and isinstance(cand_certs, list):
-        scores['certification_similarity'] = get_best_match_score(jd_certs, cand_certs)
+    if profile.certifications is not None and isinstance(cand_certs, list):
+        scores['certification_similarity'] = _coverage(profile.certifications, profile.cert_embs, cand_certs, embeddings)
     else:
         scores['certification_similarity'] = 0.0
 
     # 3. Required Skill
-    jd_skills = job_data.get('skills', [])
     # Access skills from flatten structure
     cand_skills = candidate_data.get('skills', [])
     
-    if isinstance(jd_skills, list) and isinstance(cand_skills, list):
-        scores['skill_similarity'] = get_best_match_score(jd_skills, cand_skills)
+    if profile.skills is not None and isinstance(cand_skills, list):
+        scores['skill_similarity'] = _coverage(profile.skills, profile.skill_embs, cand_skills, embeddings)
     else:
         scores['skill_similarity'] = 0.0
 
     # 4. Description vs Focus (now 'description' in new schema)
-    # JD Description
-    jd_desc = job_data.get('description', '')
-    
     # Candidate "Focus" from Experience and Projects
     cand_focuses = []
     
@@ -189,12 +370,9 @@ def calculate_semantic_score(candidate_data, job_data):
         if 'description' in proj:
             cand_focuses.append(proj['description'])
             
-    if jd_desc and cand_focuses:
-        jd_desc_emb = model.encode([jd_desc])
-        focus_embs = model.encode(cand_focuses)
-        
+    if profile.description and cand_focuses:
         # Calculate similarity for each focus
-        sims = cosine_similarity(jd_desc_emb, focus_embs)[0]
+        sims = (profile.description_emb @ normalize_rows(encode_texts(cand_focuses, embeddings)).T)[0]
         
         # Pick the highest one
         scores['description_focus_similarity'] = float(sims.max())
@@ -203,29 +381,21 @@ def calculate_semantic_score(candidate_data, job_data):
 
     return scores
 
-def compute_hybrid_fit_score(candidate_data, job_data, weights=None):
+def compute_hybrid_fit_score(candidate_data, job_data, weights=None, embeddings=None):
     """
     Combines rule-based and semantic scores into a final weighted score.
     """
     if weights is None:
-        weights = {
-            # Rule based (bonuses)
-            'degree_score': 0.1, # Don't use degree score * degree check
-            'experience_score': 0.2, # Don't use experience score * experience check
-            
-            # Semantic
-            'education_course': 0.15,
-            'certifications': 0.1,
-            'skills': 0.3,
-            'description_focus': 0.15
-        }
+        weights = DEFAULT_WEIGHTS
         
+    profile = as_jd_profile(job_data, embeddings)
+
     # 1. Get Rule Scores
-    rule_res = calculate_rule_based_score(candidate_data, job_data)
+    rule_res = calculate_rule_based_score(candidate_data, profile.jd)
     rule_scores_raw = rule_res['scores']
     
     # 2. Get Semantic Scores
-    semantic_scores = calculate_semantic_score(candidate_data, job_data)
+    semantic_scores = calculate_semantic_score(candidate_data, profile, embeddings)
     
     # 3. Combine
     # Note: rule_scores_raw['degree_check'] might be > 1.0 (bonus)
@@ -253,13 +423,175 @@ def compute_hybrid_fit_score(candidate_data, job_data, weights=None):
         }
     }
 
+# ========================================================
+# VECTORIZED KERNEL (N CANDIDATES IN ONE PASS)
+# ========================================================
+
+def pad_embeddings(text_lists: List[List[str]], vectors: np.ndarray, row_of: Dict[str, int]):
+    """
+    Gathers each candidate's rows of a normalized embedding matrix into a
+    padded (N, L, D) tensor plus an (N, L) mask of real entries.
+    """
+    width = max([len(t) for t in text_lists] + [1])
+    idx = np.zeros((len(text_lists), width), dtype=np.int64)
+    mask = np.zeros((len(text_lists), width), dtype=bool)
+    for i, texts in enumerate(text_lists):
+        idx[i, :len(texts)] = [row_of[t] for t in texts]
+        mask[i, :len(texts)] = True
+    if not len(vectors):
+        return np.zeros(idx.shape + (0,), dtype=np.float32), mask
+    return vectors[idx], mask
+
+def _masked_sims(jd_embs: np.ndarray, cand_embs: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """(N, Q, L) cosine similarities with padded slots set to -inf."""
+    sims = np.einsum('qd,nld->nql', jd_embs, cand_embs)
+    sims[~np.broadcast_to(mask[:, None, :], sims.shape)] = -np.inf
+    return sims
+
+def kernel_best_match_coverage(jd_embs: np.ndarray, cand_embs: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Vectorized get_best_match_score: mean over JD items of the best candidate match."""
+    n = len(mask)
+    if not len(jd_embs):
+        return np.ones(n)
+    has_items = mask.any(axis=1)
+    out = np.zeros(n)
+    if has_items.any():
+        best = _masked_sims(jd_embs, cand_embs[has_items], mask[has_items]).max(axis=2)
+        out[has_items] = best.mean(axis=1)
+    return out
+
+def kernel_max_similarity(jd_embs: np.ndarray, cand_embs: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Vectorized single best match (max of maxes); 0.0 where either side is empty."""
+    out = np.zeros(len(mask))
+    has_items = mask.any(axis=1)
+    if len(jd_embs) and has_items.any():
+        out[has_items] = _masked_sims(jd_embs, cand_embs[has_items], mask[has_items]).max(axis=(1, 2))
+    return out
+
+def _semantic_fields(candidate_data) -> Dict[str, Optional[List[str]]]:
+    """The candidate strings each semantic feature compares (None = unusable type)."""
+    certs = candidate_data.get('certifications', [])
+    skills = candidate_data.get('skills', [])
+    focuses = [item['description'] for section in ('experience', 'projects')
+               for item in candidate_data.get(section, []) if 'description' in item]
+    return {
+        'courses': [e.get('course', '') for e in candidate_data.get('education', []) if e.get('course')],
+        'certifications': certs if isinstance(certs, list) else None,
+        'skills': skills if isinstance(skills, list) else None,
+        'focuses': focuses,
+    }
+
+def semantic_feature_matrix(resumes: List[Dict], profile: JDProfile, embeddings=None) -> np.ndarray:
+    """
+    Computes the four semantic similarities of calculate_semantic_score for N
+    candidates at once. Returns an (N, 4) array in FEATURE_WEIGHTS order.
+    """
+    fields = [_semantic_fields(r) for r in resumes]
+    if embeddings is None:
+        texts = []
+        for f in fields:
+            for items in f.values():
+                texts.extend(items or [])
+        embeddings = build_embedding_table(texts)
+    row_of = {t: i for i, t in enumerate(embeddings)}
+    vectors = normalize_rows(np.stack(list(embeddings.values()))) if embeddings else np.zeros((0, 0), dtype=np.float32)
+
+    out = np.zeros((len(resumes), 4))
+    for start in range(0, len(resumes), KERNEL_CHUNK_SIZE):
+        chunk = fields[start:start + KERNEL_CHUNK_SIZE]
+        rows = slice(start, start + len(chunk))
+
+        # 1. Education (Course): 1.0 when the JD asks for none
+        if not profile.course_required:
+            out[rows, 0] = 1.0
+        elif profile.courses:
+            out[rows, 0] = kernel_max_similarity(profile.course_embs, *pad_embeddings([f['courses'] for f in chunk], vectors, row_of))
+
+        # 2./3. Certification and skill coverage (0.0 for unusable types on either side)
+        for col, key, jd_items, jd_embs in ((1, 'certifications', profile.certifications, profile.cert_embs),
+                                            (2, 'skills', profile.skills, profile.skill_embs)):
+            if jd_items is None:
+                continue
+            valid = np.array([f[key] is not None for f in chunk])
+            lists = [f[key] or [] for f in chunk]
+            coverage = np.ones(len(chunk)) if not jd_items else kernel_best_match_coverage(jd_embs, *pad_embeddings(lists, vectors, row_of))
+            out[rows, col] = np.where(valid, coverage, 0.0)
+
+        # 4. Description vs Focus
+        if profile.description:
+            out[rows, 3] = kernel_max_similarity(profile.description_emb, *pad_embeddings([f['focuses'] for f in chunk], vectors, row_of))
+
+    return out
+
+def weights_vector(weights: Optional[Dict] = None) -> np.ndarray:
+    weights = weights or DEFAULT_WEIGHTS
+    return np.array([weights[w] for _, _, w in FEATURE_WEIGHTS])
+
+def weighted_totals(features: np.ndarray, weights: Optional[Dict] = None) -> np.ndarray:
+    """Final 0-100 scores for an (N, 6) feature matrix under the given weights."""
+    return features @ weights_vector(weights) * 100
+
+def rescore_features(features: np.ndarray, degree_ranks, experience_years, req_rank: int,
+                     min_experience: float, weights: Optional[Dict] = None):
+    """
+    Re-applies hard-constraint thresholds and weights to stored feature rows
+    without touching embeddings. Mirrors calculate_rule_based_score:
+    degree_check is 0.0 below the required rank and gets a 0.2 bonus per rank above it.
+    Returns (totals, degree_ok, experience_ok, features).
+    """
+    features = np.array(features, dtype=float).reshape(-1, len(FEATURE_WEIGHTS))
+    degree_ranks = np.asarray(degree_ranks, dtype=float)
+    experience_years = np.asarray(experience_years, dtype=float)
+
+    if req_rank > 0:
+        degree_ok = degree_ranks >= req_rank
+        features[:, 0] = np.where(degree_ok, 1.0 + 0.2 * (degree_ranks - req_rank), 0.0)
+    else:
+        degree_ok = np.ones(len(features), dtype=bool)
+        features[:, 0] = 1.0
+    experience_ok = experience_years >= min_experience
+    features[:, 1] = experience_ok.astype(float)
+
+    return weighted_totals(features, weights), degree_ok, experience_ok, features
+
+def score_candidates_matrix(resumes: List[Dict], jd, weights=None, embeddings=None) -> List[Dict]:
+    """
+    Vectorized compute_hybrid_fit_score for a pool of candidates.
+    Returns one result per resume in the same shape as compute_hybrid_fit_score,
+    plus the raw 'features' row (FEATURE_WEIGHTS order) used for the total.
+    """
+    profile = as_jd_profile(jd)
+    rule_scores = [calculate_rule_based_score(r, profile.jd)['scores'] for r in resumes]
+    semantic = semantic_feature_matrix(resumes, profile, embeddings)
+
+    features = np.zeros((len(resumes), len(FEATURE_WEIGHTS)))
+    features[:, 0] = [s.get('degree_check', 0) for s in rule_scores]
+    features[:, 1] = [s.get('experience_check', 0) for s in rule_scores]
+    features[:, 2:] = semantic
+    totals = weighted_totals(features, weights)
+
+    results = []
+    for rules, row, total in zip(rule_scores, features, totals):
+        semantic_scores = {key: float(row[i]) for i, (group, key, _) in enumerate(FEATURE_WEIGHTS) if group == 'semantic'}
+        results.append({
+            'final_score': float(total),
+            'rule_score': rules,
+            'semantic_score': semantic_scores,
+            'breakdown': {
+                'rules': rules,
+                'semantic': semantic_scores
+            },
+            'features': row.tolist()
+        })
+    return results
+
 # ========================================================
 # COMPATIBILITY ADAPTERS FOR MAIN.PY
 # ========================================================
 
-def check_hard_constraints(resume: Dict, jd: Dict) -> Dict:
+def check_hard_constraints(resume: Dict, jd) -> Dict:
     """Adapter for calculate_rule_based_score to match main.py expectations."""
-    res = calculate_rule_based_score(resume, jd)
+    res = calculate_rule_based_score(resume, jd.jd if isinstance(jd, JDProfile) else jd)
     if not res['qualified']:
         # Find which rule failed
         scores = res['scores']
@@ -271,10 +603,23 @@ def check_hard_constraints(resume: Dict, jd: Dict) -> Dict:
         return {"pass": False, "reason": reason}
     return {"pass": True, "reason": "Qualified"}
 
-def calculate_hybrid_score(resume: Dict, jd: Dict) -> Dict:
+def calculate_hybrid_score(resume: Dict, jd, embeddings: Optional[Dict] = None) -> Dict:
     """Adapter for compute_hybrid_fit_score to match main.py expectations."""
-    res = compute_hybrid_fit_score(resume, jd)
+    res = compute_hybrid_fit_score(resume, jd, embeddings=embeddings)
     return {
         "total_score": round(res['final_score'], 2),
         "breakdown": res['breakdown']
-    }
\ No newline at end of file
+    }
+
+def calculate_hybrid_scores_batch(resumes: List[Dict], jd, weights: Optional[Dict] = None) -> List[Dict]:
+    """
+    Batch variant of calculate_hybrid_score for a whole request.
+    jd may be a parsed JD or a JDProfile; every resume string is encoded once
+    into a shared table and all candidates are scored by the vectorized kernel.
+    """
+    res = score_candidates_matrix(resumes, jd, weights)
+    return [{
+        "total_score": round(r['final_score'], 2),
+        "breakdown": r['breakdown'],
+        "features": r['features']
+    } for r in res]
@@ -0,0 +1,96 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import file_loader
+
+# "thread": CPU stages run in the API process on worker threads (one core for model inference).
+# "process": CPU stages run on a process pool; each worker loads the embedding model once.
+STAGE_EXECUTOR = os.getenv("STAGE_EXECUTOR", "thread")
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", os.cpu_count() or 1))
+# Smallest slice of a scoring batch worth shipping to a worker
+MIN_SCORE_CHUNK = 32
+
+def _init_worker(workers: int):
+    """
+    Process-pool initializer. OCR runs inline (files are already spread over workers),
+    torch / ONNX Runtime get their share of the cores, and the model is loaded now rather
+    than on the first task. Workers share the persistent embedding cache with the API
+    process (its SQLite index is safe for several writers).
+    """
+    file_loader.OCR_WORKERS = 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    import onnx_embedder
+    onnx_embedder.ONNX_THREADS = threads
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    import model_registry
+    import scoring
+    model_registry.warmup([scoring.MODEL_NAME])
+
+def ingest_stage(content: bytes) -> Dict:
+    return file_loader.ingest_resume_bytes(content)
+
+def score_stage(resumes: List[Dict], jd_data: Dict) -> List[Dict]:
+    from scoring import calculate_hybrid_scores_batch, load_or_build_jd_profile
+    return calculate_hybrid_scores_batch(resumes, load_or_build_jd_profile(jd_data))
+
+class StageExecutor:
+    """
+    Runs the CPU-bound pipeline stages (PDF ingestion/OCR, embedding + scoring) off the
+    event loop, so LLM I/O keeps flowing while they run. In "process" mode a scoring
+    batch is split across workers; features are per candidate, so results are identical.
+    """
+
+    def __init__(self, mode: str = STAGE_EXECUTOR, workers: int = STAGE_WORKERS):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown stage executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """
+        Starts the process pool and loads the model in every worker up front.
+        Blocking: call it from the startup hook (in a thread), not from a request.
+        """
+        if self.mode != "process" or self.pool is not None:
+            return
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.workers,),
+        )
+        # Force every worker to spawn (and run the initializer) now
+        for future in [self.pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def _run(self, fn, *args):
+        if self.mode == "process":
+            if self.pool is None:
+                raise RuntimeError("StageExecutor.start() must run before stages are submitted")
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def ingest(self, content: bytes) -> Dict:
+        return await self._run(ingest_stage, content)
+
+    async def score(self, resumes: List[Dict], jd_data: Dict) -> List[Dict]:
+        if self.mode != "process" or len(resumes) <= MIN_SCORE_CHUNK:
+            return await self._run(score_stage, resumes, jd_data)
+        size = max(MIN_SCORE_CHUNK, -(-len(resumes) // self.workers))
+        chunks = await asyncio.gather(*(
+            self._run(score_stage, resumes[i:i + size], jd_data) for i in range(0, len(resumes), size)
+        ))
+        return [score for chunk in chunks for score in chunk]
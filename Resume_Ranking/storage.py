@@ -0,0 +1,30 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+# Root for all persistent caches (embeddings, parsed documents, rankings)
+CACHE_DIR = Path(os.getenv("DEEPSCREEN_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+# Shared SQLite database for requisitions and other small structured records
+DB_PATH = CACHE_DIR / "deepscreen.db"
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different copies of a string share one key."""
+    return re.sub(r"\s+", " ", text).strip()
+
+def text_hash(text: str, namespace: str = "") -> str:
+    """Content address for a string, optionally scoped (e.g. by model name)."""
+    return hashlib.sha256(f"{namespace}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+def json_hash(obj, namespace: str = "") -> str:
+    """Content address for JSON-serializable data (key order does not matter)."""
+    return text_hash(json.dumps(obj, sort_keys=True), namespace)
+
+def connect(db_path=DB_PATH) -> sqlite3.Connection:
+    """Opens the shared SQLite database (WAL mode, usable from worker threads)."""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
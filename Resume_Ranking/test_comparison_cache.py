@@ -0,0 +1,46 @@
+import asyncio
+
+from comparison_cache import ComparisonCache, ComparisonGraph
+from llm_ranking import comparison_key, rank_candidates_with_mergesort
+from test_ranking import MOCK_JD
+
+CANDIDATES = [{"filename": name, "extracted_data": {"name": name, "skills": [name]}} for name in "ABCDE"]
+
+def rank(jd_data: dict, cache: ComparisonCache) -> list:
+    candidates = [dict(c) for c in reversed(CANDIDATES)]
+    ranked = asyncio.run(rank_candidates_with_mergesort(candidates, "summary", cache=cache, jd_key=comparison_key(jd_data)))
+    return [c["filename"] for c in ranked]
+
+def test_verdicts_are_not_shared_between_jds(tmp_path, stub_comparator):
+    calls = stub_comparator
+    cache = ComparisonCache(tmp_path / "test.db")
+    other_jd = dict(MOCK_JD, title="Backend Engineer", min_experience_years=3)
+
+    assert rank(MOCK_JD, cache) == list("ABCDE")
+    first = len(calls)
+    assert first > 0
+
+    # Same JD: every verdict comes from the cache
+    assert rank(dict(MOCK_JD), cache) == list("ABCDE")
+    assert len(calls) == first
+
+    # A different JD (same one-line summary) starts from nothing
+    assert rank(other_jd, cache) == list("ABCDE")
+    assert len(calls) == 2 * first
+
+def test_graph_loads_only_requested_candidates(tmp_path):
+    cache = ComparisonCache(tmp_path / "test.db")
+    cache.put("jd", "a", "b", True, "a over b")
+    cache.put("jd", "b", "c", True, "b over c")
+    cache.put("jd", "c", "x", True, "c over x")
+
+    graph = ComparisonGraph(cache, "jd")
+    graph.load(["a", "b", "c"])
+    assert "x" not in graph.reach.get("c", set())
+    assert graph.lookup("a", "b") == (True, "a over b", None)
+    assert graph.lookup("c", "a") == (False, None, ["a", "b", "c"])
+
+    # Without a JD key nothing is read from the shared cache
+    unkeyed = ComparisonGraph(cache, None)
+    unkeyed.load(["a", "b"])
+    assert unkeyed.lookup("a", "b") is None
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import scoring
+from model_registry import get_embedder, get_model
+from scoring import MODEL_NAME, JDProfile, calculate_hybrid_scores_batch, collect_resume_texts
+from test_ranking import MOCK_JD, CANDIDATE_REAL_DINESH, CANDIDATE_REAL_SHREETHAR, CANDIDATE_FAKE_SHREETHAR
+
+CANDIDATES = [CANDIDATE_REAL_DINESH, CANDIDATE_REAL_SHREETHAR, CANDIDATE_FAKE_SHREETHAR]
+
+# Minimum per-text cosine between a backend's vector and the torch vector
+MIN_COSINE = {"onnx": 0.999, "onnx-int8": 0.98}
+# Maximum drift of a hybrid total score (0-100) against torch
+MAX_SCORE_DELTA = {"onnx": 0.05, "onnx-int8": 1.0}
+BACKEND_PACKAGES = {"torch": ["sentence_transformers"], "onnx": ["onnxruntime", "tokenizers", "huggingface_hub"]}
+
+def fixture_texts():
+    texts = MOCK_JD["skills"] + [MOCK_JD["description"]]
+    for cand in CANDIDATES:
+        texts += collect_resume_texts(cand)
+    return list(dict.fromkeys(texts))
+
+def require_backend(backend: str):
+    """Loads a backend's model, skipping the test when its packages or model files are unavailable."""
+    for package in BACKEND_PACKAGES["torch" if backend == "torch" else "onnx"]:
+        pytest.importorskip(package)
+    try:
+        return get_model(MODEL_NAME, backend)
+    except Exception as e:
+        pytest.skip(f"{backend} model unavailable: {e}")
+
+@pytest.mark.parametrize("backend", list(MIN_COSINE))
+def test_backend_cosine_parity(backend):
+    reference_model = require_backend("torch")
+    model = require_backend(backend)
+    texts = fixture_texts()
+
+    reference = reference_model.encode(texts)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    embs = model.encode(texts)
+    embs = embs / np.linalg.norm(embs, axis=1, keepdims=True)
+    assert (embs * reference).sum(axis=1).min() >= MIN_COSINE[backend]
+
+@pytest.mark.parametrize("backend", list(MAX_SCORE_DELTA))
+def test_backend_score_parity(backend, monkeypatch):
+    require_backend("torch")
+    require_backend(backend)
+    totals = {}
+    for name in ("torch", backend):
+        monkeypatch.setattr(scoring, "embedder", get_embedder(MODEL_NAME, name))
+        results = calculate_hybrid_scores_batch(CANDIDATES, JDProfile.build(MOCK_JD))
+        totals[name] = [r["total_score"] for r in results]
+
+    for expected, actual in zip(totals["torch"], totals[backend]):
+        assert abs(expected - actual) <= MAX_SCORE_DELTA[backend]
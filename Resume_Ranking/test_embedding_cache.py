@@ -0,0 +1,88 @@
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from embedding_cache import EmbeddingCache
+from storage import text_hash
+
+DIM = 8
+
+class FakeModel:
+    """Deterministic stand-in for a SentenceTransformer that counts encoded texts."""
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, batch_size=32):
+        self.encoded += len(texts)
+        return np.stack([vector(t) for t in texts])
+
+def vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    return np.random.default_rng(seed).random(DIM, dtype=np.float32) + len(text)
+
+def make_cache(tmp_path, model=None, **limits):
+    return EmbeddingCache(model or FakeModel(), "fake-model", cache_dir=tmp_path, **limits)
+
+def test_memory_and_disk_hits(tmp_path):
+    model = FakeModel()
+    cache = make_cache(tmp_path, model, max_memory_items=2)
+    texts = ["python", "pytorch", "fastapi"]
+
+    first = cache.encode(texts)
+    assert model.encoded == 3
+    # Whitespace variants share the entry; evicted-from-RAM ones come back from disk
+    second = cache.encode(["  python ", "pytorch", "fastapi"])
+    assert model.encoded == 3
+    assert np.allclose(first, second)
+    stats = cache.stats()
+    assert stats["misses"] == 3
+    assert stats["hits_memory"] + stats["hits_disk"] == 3
+    assert stats["hits_disk"] >= 1
+    assert stats["disk_items"] == 3
+
+def test_disk_eviction_keeps_vectors_consistent(tmp_path):
+    model = FakeModel()
+    cache = make_cache(tmp_path, model, max_memory_items=1, max_disk_items=20)
+    texts = [f"skill {i}" for i in range(50)]
+    for text in texts:
+        cache.encode([text])
+
+    assert cache.stats()["disk_items"] <= 20
+    # Every key still indexed must point at its own vector, not at a reused row's
+    by_key = {text_hash(t, cache.model_name): t for t in texts}
+    for key, row in cache.conn.execute("SELECT key, row FROM entries").fetchall():
+        assert np.allclose(cache.vectors[row], vector(by_key[key]))
+    assert np.allclose(cache.encode(texts[-1]), vector(texts[-1]))
+
+def test_reload_after_restart(tmp_path):
+    texts = ["machine learning", "computer vision", "rag pipelines"]
+    cache = make_cache(tmp_path)
+    expected = cache.encode(texts)
+    cache.flush()
+
+    model = FakeModel()
+    reopened = make_cache(tmp_path, model)
+    assert np.allclose(reopened.encode(texts), expected)
+    assert model.encoded == 0
+    assert reopened.stats()["hits_disk"] == 3
+
+def warm_cache(cache_dir, texts) -> int:
+    """Runs in a worker process: fills the shared disk tier."""
+    model = FakeModel()
+    EmbeddingCache(model, "fake-model", cache_dir=cache_dir).encode(texts)
+    return model.encoded
+
+def test_cold_cache_reads_rows_written_by_another_process(tmp_path):
+    texts = ["python", "pytorch", "fastapi"]
+    model = FakeModel()
+    cold = make_cache(tmp_path, model)  # opened before any vector (and dimension) exists
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert pool.submit(warm_cache, tmp_path, texts).result() == 3
+
+    embs = cold.encode(texts)
+    assert model.encoded == 0
+    assert cold.stats()["hits_disk"] == 3
+    for text, emb in zip(texts, embs):
+        assert np.allclose(emb, vector(text))
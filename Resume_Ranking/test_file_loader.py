@@ -33,6 +33,35 @@ def test_resume_ingestion(pdf_path: str):
     except Exception as e:
         print(f"❌ Extraction Failed: {e}")
 
+def native_pdf(pages) -> bytes:
+    """PDF with a text layer only: one page per string."""
+    import pymupdf
+    with pymupdf.open() as doc:
+        for text in pages:
+            doc.new_page().insert_textbox(pymupdf.Rect(50, 50, 550, 800), text, fontsize=10)
+        return doc.tobytes()
+
+def test_short_trailing_page_skips_ocr(monkeypatch):
+    import file_loader
+    body = "Experienced machine learning engineer building RAG pipelines with PyTorch and FastAPI. " * 20
+    ocr_calls = []
+
+    def fake_ocr(page_pdfs):
+        ocr_calls.append(len(page_pdfs))
+        return [{"text": "", "dpi": 0, "confidence": 0.0} for _ in page_pdfs]
+
+    monkeypatch.setattr(file_loader, "ocr_pages", fake_ocr)
+    result = file_loader.ingest_resume_bytes(native_pdf([body, "References available on request."]))
+    assert not result["used_ocr"]
+    assert "References available on request." in result["text"]
+    assert ocr_calls == []
+
+    # A page with no text layer at all is still OCR'd
+    blank = file_loader.ingest_resume_bytes(native_pdf([body, ""]))
+    assert blank["used_ocr"]
+    assert [p["page"] for p in blank["ocr_pages"]] == [1]
+    assert ocr_calls == [1]
+
 if __name__ == "__main__":
     # Check if path is provided as argument
     if len(sys.argv) > 1:
@@ -0,0 +1,29 @@
+import asyncio
+
+from llm_ranking import insert_candidates_into_ranking
+from requisitions import drop_reuploads
+
+def candidate(name: str, fhash: str, filename: str = "CV.pdf") -> dict:
+    return {"filename": filename, "file_hash": fhash, "status": "QUALIFIED", "extracted_data": {"name": name}}
+
+def names(ranked: list) -> list:
+    return [c["extracted_data"]["name"] for c in ranked]
+
+def test_insert_into_existing_ranking(stub_comparator):
+    calls = stub_comparator
+    stored = [candidate("A", "h-a"), candidate("C", "h-c"), candidate("E", "h-e")]
+
+    # A different applicant who also uploaded "CV.pdf" does not displace anyone
+    new = [candidate("D", "h-d"), candidate("B", "h-b")]
+    ranked = drop_reuploads(stored, new)
+    assert names(ranked) == ["A", "C", "E"]
+
+    ranked = asyncio.run(insert_candidates_into_ranking(ranked, new, "summary"))
+    assert names(ranked) == ["A", "B", "C", "D", "E"]
+    # Binary insertion: at most ceil(log2(n + 1)) comparisons per new candidate
+    assert len(calls) <= 2 + 3
+
+def test_reupload_replaces_previous_entry():
+    stored = [candidate("A", "h-a"), candidate("C", "h-c", "c_old_name.pdf")]
+    ranked = drop_reuploads(stored, [candidate("C", "h-c", "c_renamed.pdf")])
+    assert names(ranked) == ["A"]
@@ -0,0 +1,33 @@
+from requisitions import RequisitionStore
+from test_ranking import MOCK_JD, CANDIDATE_REAL_DINESH, CANDIDATE_FAKE_SHREETHAR
+
+def scored(fhash: str, filename: str, resume: dict, features: list) -> dict:
+    return {
+        "filename": filename,
+        "file_hash": fhash,
+        "extracted_data": resume,
+        "breakdown": {"rules": {"total_experience_years": 1.0}},
+        "features": features,
+    }
+
+def test_same_filename_different_documents(tmp_path):
+    store = RequisitionStore(tmp_path / "test.db")
+    req_id = store.register(MOCK_JD)
+    store.save_scores(req_id, [
+        scored("hash-a", "CV.pdf", CANDIDATE_REAL_DINESH, [1.0, 1.0, 0.9, 0.0, 0.9, 0.9]),
+        scored("hash-b", "CV.pdf", CANDIDATE_FAKE_SHREETHAR, [1.0, 1.0, 0.1, 0.0, 0.1, 0.1]),
+    ])
+
+    results = store.rescore(req_id)
+    assert sorted(r["file_hash"] for r in results) == ["hash-a", "hash-b"]
+    assert [r["filename"] for r in results] == ["CV.pdf", "CV.pdf"]
+    assert results[0]["rank_score"] != results[1]["rank_score"]
+
+def test_existing_requisition_keeps_its_jd(tmp_path):
+    store = RequisitionStore(tmp_path / "test.db")
+    req_id = store.register(MOCK_JD)
+    other_jd = dict(MOCK_JD, min_experience_years=5)
+
+    assert store.register(dict(MOCK_JD), req_id) == req_id
+    assert store.register(other_jd, req_id) is None
+    assert store.get_jd(req_id) == MOCK_JD
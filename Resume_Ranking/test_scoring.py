@@ -0,0 +1,32 @@
+import numpy as np
+from scoring import JDProfile, DEFAULT_WEIGHTS, calculate_hybrid_score, calculate_hybrid_scores_batch, compute_hybrid_fit_score, score_candidates_matrix, weighted_totals
+from test_ranking import MOCK_JD, CANDIDATE_REAL_DINESH, CANDIDATE_REAL_SHREETHAR, CANDIDATE_FAKE_SHREETHAR
+
+CANDIDATES = [CANDIDATE_REAL_DINESH, CANDIDATE_REAL_SHREETHAR, CANDIDATE_FAKE_SHREETHAR]
+
+def test_batch_matches_single():
+    single = [calculate_hybrid_score(c, MOCK_JD) for c in CANDIDATES]
+    batch = calculate_hybrid_scores_batch(CANDIDATES, MOCK_JD)
+
+    assert len(batch) == len(CANDIDATES)
+    for a, b in zip(single, batch):
+        assert abs(a["total_score"] - b["total_score"]) < 0.01
+        for key, value in a["breakdown"]["semantic"].items():
+            assert abs(value - b["breakdown"]["semantic"][key]) < 1e-4
+
+def test_jd_profile_roundtrip():
+    profile = JDProfile.from_bytes(JDProfile.build(MOCK_JD).to_bytes())
+
+    for cand in CANDIDATES:
+        expected = calculate_hybrid_score(cand, MOCK_JD)["total_score"]
+        actual = calculate_hybrid_score(cand, profile)["total_score"]
+        assert abs(expected - actual) < 0.01
+
+def test_kernel_reweighting():
+    weights = dict(DEFAULT_WEIGHTS, skills=0.5, description_focus=0.05)
+    features = np.array([r["features"] for r in score_candidates_matrix(CANDIDATES, MOCK_JD)])
+    totals = weighted_totals(features, weights)
+
+    for cand, total in zip(CANDIDATES, totals):
+        expected = compute_hybrid_fit_score(cand, MOCK_JD, weights)["final_score"]
+        assert abs(expected - total) < 0.01
@@ -1,11 +1,13 @@
 
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from datetime import datetime
+from model_registry import get_embedder
 
-# Load model once
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Model is loaded lazily, once per process, by the registry (shared with scoring.py)
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Cached front for model.encode
+embedder = get_embedder(MODEL_NAME)
 
 def calculate_years_from_ranges(experience_list):
     """
@@ -147,8 +149,8 @@ def get_best_match_score(query_list, target_list):
     if not target_list:
         return 0.0
         
-    query_embs = model.encode(query_list)
-    target_embs = model.encode(target_list)
+    query_embs = embedder.encode(query_list)
+    target_embs = embedder.encode(target_list)
     
     # shape: (n_query, n_target)
     sim_matrix = cosine_similarity(query_embs, target_embs)
@@ -181,8 +183,8 @@ def calculate_semantic_score(candidate_data, job_data):
 
         if jd_courses_list:
             # Compare all JD courses vs all candidate courses
-            jd_embs = model.encode(jd_courses_list)
-            cand_embs = model.encode(cand_courses)
+            jd_embs = embedder.encode(jd_courses_list)
+            cand_embs = embedder.encode(cand_courses)
             
             # Matrix shape: (n_jd_options, n_cand_courses)
             cos_sim_matrix = cosine_similarity(jd_embs, cand_embs)
@@ -231,8 +233,8 @@ def calculate_semantic_score(candidate_data, job_data):
             cand_focuses.append(proj['focus'])
             
     if jd_desc and cand_focuses:
-        jd_desc_emb = model.encode([jd_desc])
-        focus_embs = model.encode(cand_focuses)
+        jd_desc_emb = embedder.encode([jd_desc])
+        focus_embs = embedder.encode(cand_focuses)
         
         # Calculate similarity for each focus
         sims = cosine_similarity(jd_desc_emb, focus_embs)[0]
@@ -1,9 +1,22 @@
 import json
-from sentence_transformers import SentenceTransformer
+import os
+import sys
+from pathlib import Path
 
-model = SentenceTransformer("all-mpnet-base-v2")
+import numpy as np
 
-file_path = "portfolio_output.json"
+# Shared model registry and embedding cache live with the ranking service
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Resume_Ranking"))
+from model_registry import get_embedder
+
+MODEL_NAME = "all-mpnet-base-v2"
+embedder = get_embedder(MODEL_NAME)
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine of two embeddings (no model needed when both came from the cache)."""
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+file_path = Path(__file__).resolve().parent / "portfolio_output.json"
 
 try:
     with open(file_path, 'r') as file:
@@ -22,12 +35,13 @@ except Exception as e:
 
 print(data_dict['projects'][3])
 
-portfolio_embedding = model.encode(str(data_dict['projects'][3]))
+portfolio_embedding = embedder.encode(str(data_dict['projects'][3]))
 
 resume_output = """
 a.Used EfficientAD to detect visual anomalies within an image, including segmentation using PyTorch
 """
-resume_embedding = model.encode(resume_output)
+resume_embedding = embedder.encode(resume_output)
 
-similarities = model.similarity(portfolio_embedding, resume_embedding)
-print(similarities)
\ No newline at end of file
+similarity = cosine_similarity(portfolio_embedding, resume_embedding)
+print(similarity)
+print(embedder.stats())